@@ -39,17 +39,22 @@ Note: This script expects normalized input from upstream processing. No addition
 cleaning is performed since data-ref values are already clean.
 """
 
+import numpy as np
 import pandas as pd
 import argparse
 import sys
 import os
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
+import yaml
 from _scripts_utils import save_dataframe_with_lilypond_csv, get_project_name
 
 # =============================================================================
 # PROJECT CONFIGURATION LOADING
 # =============================================================================
 
+@lru_cache(maxsize=None)
 def load_project_no_duplicates():
     """
     Load no-duplicates configuration from project-specific YAML file.
@@ -60,6 +65,8 @@ def load_project_no_duplicates():
     3. Extracts noDuplicates value from YAML if file exists
     4. Falls back to default no-duplicates of True if no config or errors
     
+    The result is cached, so the config file is only read once per run.
+    
     The YAML file format expected:
         noDuplicates: false
         # Other project settings can be added here
@@ -72,23 +79,18 @@ def load_project_no_duplicates():
     
     print(f"🔍 Looking for project config: {config_file}")
     
-    if config_file.exists():
-        try:
-            import yaml
+    try:
+        with open(config_file, 'r') as f:
             print(f"📄 Loading config from: {config_file}")
-            with open(config_file, 'r') as f:
-                config = yaml.safe_load(f)
-                no_duplicates = config.get('noDuplicates', True)
-                print(f"⚙️  Using noDuplicates from config: {no_duplicates}")
-                return no_duplicates
-        except ImportError:
-            print(f"⚠️  Warning: PyYAML not installed, cannot read {config_file}")
-            print(f"   Install with: pip install PyYAML")
-        except Exception as e:
-            print(f"⚠️  Warning: Could not load {config_file}: {e}")
-            print(f"   Using default noDuplicates")
-    else:
+            config = yaml.safe_load(f)
+            no_duplicates = config.get('noDuplicates', True)
+            print(f"⚙️  Using noDuplicates from config: {no_duplicates}")
+            return no_duplicates
+    except FileNotFoundError:
         print(f"📝 No config file found, using default noDuplicates")
+    except Exception as e:
+        print(f"⚠️  Warning: Could not load {config_file}: {e}")
+        print(f"   Using default noDuplicates")
     
     return True  # Default no-duplicates
 
@@ -107,6 +109,9 @@ Examples:
   
   # Enable duplicate squashing explicitly:
   python squash-tied-note-heads.py -i noteheads.csv -t ties.csv -o squashed_noteheads.csv -nd
+  
+  # List every squashed duplicate group:
+  python squash-tied-note-heads.py -i noteheads.csv -t ties.csv -o squashed_noteheads.csv -nd -v
 
 Configuration Files:
   Create PROJECT_NAME.yaml in the working directory to set project-specific duplicate handling:
@@ -143,49 +148,71 @@ Pipeline Integration:
                        help='Remove duplicate noteheads at same position '
                             '(default: auto-detect from project config or true)')
     
+    parser.add_argument('-v', '--verbose',
+                       action='store_true',
+                       help='Report every squashed duplicate group, not just the totals')
+    
     return parser.parse_args()
 
-def collect_full_tie_group(primary_data_ref, ties_df):
+def build_tie_groups(ties_df):
     """
-    Collect all noteheads connected by ties, starting from a primary notehead.
+    Collect the tie group of every primary notehead from one tie adjacency map.
     
     Musical ties can form chains: Note A -> Note B -> Note C, where each
-    arrow represents a tie. This function follows the entire chain to collect
-    all connected noteheads for a single sustained musical event.
+    arrow represents a tie. Each primary's group is everything reachable by
+    following ties forward from it (breadth-first, so secondaries come in
+    chain order). The adjacency map is built once from the tie edges, instead
+    of filtering the ties DataFrame for every visited notehead.
+    
+    The 'primary' and 'secondary' columns must be Categoricals sharing the
+    data-ref categories, so the search works on integer codes rather than on
+    the data-ref strings.
     
     Args:
-        primary_data_ref (str): Starting notehead reference (already normalized)
-        ties_df (DataFrame): Tie relationships with 'primary' and 'secondary' columns
+        ties_df (DataFrame): Tie relationships with categorical 'primary' and
+                             'secondary' columns
         
     Returns:
-        list: All secondary data-ref references in the tie group (excluding the primary)
+        Series: Indexed by primary data-ref code, holding the pipe-separated
+                secondary data-refs of its tie group (excluding the primary), in
+                breadth-first order. Noteheads without ties are absent.
         
     Example:
-        If Note A ties to B, and B ties to C:
-        collect_full_tie_group("A", ties_df) -> ["B", "C"]
+        If Note A ties to B, and B ties to C (codes 0, 1, 2):
+        build_tie_groups(ties_df) -> Series({0: "B|C"})
     """
-    tied_secondaries = []  # Only secondary data-refs (primary not included)
-    visited = set([primary_data_ref])  # Track visited notes to prevent infinite loops
-    processing_queue = [primary_data_ref]  # Notes whose ties we still need to check
-
-    # Breadth-first search through the tie network
-    while processing_queue:
-        current_data_ref = processing_queue.pop(0)
-        
-        # Find all notes that this current note ties TO
-        direct_secondaries = ties_df.loc[
-            ties_df["primary"] == current_data_ref, 
-            "secondary"
-        ].tolist()
-        
-        # Add newly discovered tied notes to our group
-        for secondary_data_ref in direct_secondaries:
-            if secondary_data_ref not in visited:
-                tied_secondaries.append(secondary_data_ref)
-                visited.add(secondary_data_ref)
-                processing_queue.append(secondary_data_ref)  # Check its ties too
-
-    return tied_secondaries
+    primary_codes = ties_df["primary"].cat.codes.tolist()
+    secondary_codes = ties_df["secondary"].cat.codes.tolist()
+    categories = ties_df["primary"].cat.categories
+
+    # Notes each notehead ties TO, in ties data order
+    tied_to = {}
+    for primary_code, secondary_code in zip(primary_codes, secondary_codes):
+        tied_to.setdefault(primary_code, []).append(secondary_code)
+    secondary_code_set = set(secondary_codes)
+
+    group_codes = []
+    group_data_refs = []
+    for primary_code in tied_to:
+        # Noteheads in the middle of a chain are secondaries, not primaries
+        if primary_code in secondary_code_set:
+            continue
+
+        # Breadth-first search through the tie network
+        tied_secondaries = []
+        visited = {primary_code}  # Track visited notes to prevent infinite loops
+        processing_queue = deque([primary_code])
+        while processing_queue:
+            for secondary_code in tied_to.get(processing_queue.popleft(), ()):
+                if secondary_code not in visited:
+                    tied_secondaries.append(categories[secondary_code])
+                    visited.add(secondary_code)
+                    processing_queue.append(secondary_code)
+
+        group_codes.append(primary_code)
+        group_data_refs.append("|".join(tied_secondaries))
+
+    return pd.Series(group_data_refs, index=group_codes, dtype=str, name="tied_data_refs")
 
 def main():
     """Main function with command line argument support."""
@@ -256,121 +283,139 @@ def main():
         # Ensure data_ref column is string type
         svg_df['data_ref'] = svg_df['data_ref'].astype(str)
         
+        # Tie rows with an empty primary or secondary cell have nothing to tie
+        missing_tie_count = ties_df[['primary', 'secondary']].isna().any(axis=1).sum()
+        if missing_tie_count > 0:
+            print(f"   ⚠️  Found {missing_tie_count} tie rows with missing primary/secondary values - removing them")
+            ties_df = ties_df.dropna(subset=['primary', 'secondary']).reset_index(drop=True)
+        
+        # Encode data-refs as Categoricals over one shared category set, so tie
+        # grouping hashes and compares int codes instead of long strings
+        data_ref_categories = pd.api.types.union_categoricals([
+            pd.Categorical(svg_df['data_ref']),
+            pd.Categorical(ties_df['primary'].astype(str)),
+            pd.Categorical(ties_df['secondary'].astype(str)),
+        ]).categories
+        svg_df['data_ref'] = pd.Categorical(svg_df['data_ref'], categories=data_ref_categories)
+        for column in ('primary', 'secondary'):
+            ties_df[column] = pd.Categorical(ties_df[column].astype(str), categories=data_ref_categories)
+        
         # No cleaning needed - data is already normalized from upstream processing
         print("   ✅ Data already normalized from upstream processing")
 
         # =================================================================
-        # STEP 2: IDENTIFY PRIMARY AND SECONDARY NOTEHEADS
+        # STEPS 2-4: PRIMARIES, TIE GROUPS AND DUPLICATES IN A SINGLE PASS
         # =================================================================
 
-        # Get all secondary (tied-to) data-refs from the ties data
-        secondary_data_refs = set(ties_df["secondary"]) if len(ties_df) > 0 else set()
-        print(f"   Found {len(secondary_data_refs)} secondary tied noteheads")
-        
-        # Filter to keep only primary noteheads (not secondary to any tie)
-        # IMPORTANT: Use .loc to preserve original order from extract_note_heads.py
-        original_count = len(svg_df)
-        primary_mask = ~svg_df["data_ref"].isin(secondary_data_refs)
-        primary_noteheads = svg_df.loc[primary_mask].copy()
-        filtered_count = len(primary_noteheads)
-        removed_count = original_count - filtered_count
-        
-        print(f"   Identified {filtered_count} primary noteheads")
-        print(f"   Will embed {removed_count} secondary noteheads in tie groups")
+        # Identifying primaries, attaching their tie groups and (optionally)
+        # bucketing duplicates by (snippet, x, y) are fused into one walk over
+        # the notehead rows, so no intermediate DataFrames are built.
 
-        # =================================================================
-        # STEP 3: BUILD TIE GROUPS FOR EACH PRIMARY
-        # =================================================================
+        if ties_df.empty:
+            # No ties: every notehead is a primary, skip tie grouping entirely
+            tie_groups = pd.Series(dtype=str, name="tied_data_refs")
+            secondary_codes = np.empty(0, dtype=np.int64)
+        else:
+            # One adjacency map over the tie edges gives every tie group at once
+            tie_groups = build_tie_groups(ties_df)
+            secondary_codes = np.unique(ties_df["secondary"].cat.codes.to_numpy())
+
+        # Flag secondary (tied-to) noteheads by their shared categorical code
+        is_secondary = np.zeros(len(data_ref_categories), dtype=bool)
+        is_secondary[secondary_codes] = True
+
+        data_ref_codes = svg_df["data_ref"].cat.codes.to_numpy()
+
+        if no_duplicates and not svg_df.empty:
+            # Label duplicate buckets (snippet, x, y) with integers: packing the
+            # snippet code and rounded coordinate codes into one record array
+            # lets pd.factorize hash each row once in C. Missing values get a
+            # code of their own, so, like the 'nan' in a string group key,
+            # noteheads missing the same fields can still be duplicates
+            snippet_codes, _ = pd.factorize(svg_df["snippet"].astype(str))
+            x_codes, _ = pd.factorize(svg_df["x"].round(3), use_na_sentinel=False)
+            y_codes, _ = pd.factorize(svg_df["y"].round(3), use_na_sentinel=False)
+            bucket_records = np.rec.fromarrays([snippet_codes, x_codes, y_codes])
+            bucket_labels, bucket_uniques = pd.factorize(bucket_records)
+        else:
+            # Without duplicate squashing (or without rows) no bucket is ever looked up
+            bucket_labels = np.full(len(svg_df), -1, dtype=np.int64)
+            bucket_uniques = ()
+
+        kept_positions = []          # Row positions of the noteheads that remain
+        kept_by_bucket = [None] * len(bucket_uniques)  # Bucket label -> index into kept_positions
+        duplicate_kept_indices = []  # Per squashed duplicate: index of the row it merges into
+        duplicate_codes = []         # Per squashed duplicate: its data-ref code
+        primary_count = 0
+
+        for position, (code, bucket) in enumerate(zip(data_ref_codes.tolist(), bucket_labels.tolist())):
+            # Secondary noteheads are embedded in their primary's tie group
+            if is_secondary[code]:
+                continue
+            primary_count += 1
+
+            # Rows labelled -1 are never squashed
+            if bucket >= 0:
+                kept_index = kept_by_bucket[bucket]
+                if kept_index is not None:
+                    # Same pitch and position as an earlier notehead: merge into it
+                    duplicate_kept_indices.append(kept_index)
+                    duplicate_codes.append(code)
+                    continue
+                kept_by_bucket[bucket] = len(kept_positions)
+
+            kept_positions.append(position)
+
+        # IMPORTANT: Keep rows in input order from extract_note_heads.py
+        primary_noteheads = svg_df.iloc[kept_positions].copy()
+
+        # Tie groups are already joined per primary; look them up by code.
+        # Notes with no ties get an empty string.
+        tied_data_refs = primary_noteheads["data_ref"].cat.codes.map(tie_groups).fillna("")
+
+        # Join each duplicate group's data-refs and append them to the
+        # tied_data_refs of the notehead they were merged into
+        duplicates_squashed = len(duplicate_codes)
+        duplicate_groups = pd.Series(data_ref_categories[duplicate_codes]).groupby(duplicate_kept_indices)
+        squashed_group_sizes = duplicate_groups.size()
+        if duplicates_squashed > 0:
+            duplicate_data_refs = duplicate_groups.agg("|".join).to_numpy()
+            merged_rows = primary_noteheads.index[squashed_group_sizes.index]
+            existing_tied = tied_data_refs.loc[merged_rows]
+            tied_data_refs.loc[merged_rows] = (
+                existing_tied.str.cat(duplicate_data_refs, sep="|")
+                .where(existing_tied != "", duplicate_data_refs)
+            )
+
+        primary_noteheads["tied_data_refs"] = tied_data_refs
+
+        # Tie statistics cover every primary, including squashed duplicates
+        primary_tie_groups = pd.Series(data_ref_codes[~is_secondary[data_ref_codes]]).map(tie_groups).dropna()
+        tied_notes_count = len(primary_tie_groups)
+        total_tied_data_refs = int(primary_tie_groups.astype(str).str.count(r"\|").sum()) + tied_notes_count
+
+        original_count = len(svg_df)
+        print(f"   Found {len(secondary_codes)} secondary tied noteheads")
+        print(f"   Identified {primary_count} primary noteheads")
+        print(f"   Will embed {original_count - primary_count} secondary noteheads in tie groups")
 
         print("🔗 Building tie groups for primary noteheads...")
-        
-        # Add tied_data_refs column to store pipe-separated secondary data-refs
-        tied_data_refs_list = []
-        
-        for index, row in primary_noteheads.iterrows():
-            primary_data_ref = row["data_ref"]
-            
-            # Collect all tied secondary noteheads for this primary
-            tied_secondaries = collect_full_tie_group(primary_data_ref, ties_df)
-            
-            # Convert list to pipe-separated string
-            if tied_secondaries:
-                tied_data_refs_str = "|".join(tied_secondaries)
-            else:
-                tied_data_refs_str = ""  # Empty string for notes with no ties
-            
-            tied_data_refs_list.append(tied_data_refs_str)
-        
-        # Add the tied_data_refs column to the dataframe
-        primary_noteheads["tied_data_refs"] = tied_data_refs_list
-        
-        # Count tie statistics
-        tied_notes_count = sum(1 for data_refs in tied_data_refs_list if data_refs)
-        total_tied_data_refs = sum(len(data_refs.split("|")) for data_refs in tied_data_refs_list if data_refs)
-        
         print(f"   📊 {tied_notes_count} primary noteheads have ties")
         print(f"   🔗 {total_tied_data_refs} total secondary data-refs embedded")
 
-        # =================================================================
-        # STEP 4: OPTIONALLY SQUASH DUPLICATE NOTEHEADS (SAME POSITION & PITCH)
-        # =================================================================
-
-        duplicates_squashed = 0
-        
         if no_duplicates:
             print("🔄 Squashing duplicate noteheads with same pitch and position...")
             
-            # Find duplicate groups by (snippet, x, y)
-            primary_noteheads['group_key'] = (
-                primary_noteheads['snippet'].astype(str) + '|' + 
-                primary_noteheads['x'].round(3).astype(str) + '|' + 
-                primary_noteheads['y'].round(3).astype(str)
-            )
-            
-            rows_to_drop = []
-            
-            # Process each group
-            for group_key in primary_noteheads['group_key'].unique():
-                group_rows = primary_noteheads[primary_noteheads['group_key'] == group_key]
-                
-                if len(group_rows) > 1:
-                    # Multiple noteheads at same position - squash them
-                    duplicates_squashed += len(group_rows) - 1
-                    
-                    # Get the first occurrence (primary)
-                    primary_idx = group_rows.index[0]
-                    duplicate_indices = group_rows.index[1:]
-                    
-                    # Collect duplicate data-refs
-                    duplicate_data_refs = group_rows.iloc[1:]['data_ref'].tolist()
-                    
-                    # Merge with existing tied_data_refs
-                    existing_tied = primary_noteheads.loc[primary_idx, 'tied_data_refs']
-                    if pd.isna(existing_tied) or existing_tied == "":
-                        combined_tied = "|".join(duplicate_data_refs)
-                    else:
-                        combined_tied = existing_tied + "|" + "|".join(duplicate_data_refs)
-                    
-                    # Update the primary row
-                    primary_noteheads.loc[primary_idx, 'tied_data_refs'] = combined_tied
-                    
-                    # Mark duplicate rows for removal
-                    rows_to_drop.extend(duplicate_indices)
-                    
-                    snippet = group_rows.iloc[0]['snippet']
-                    x = group_rows.iloc[0]['x']
-                    y = group_rows.iloc[0]['y']
-                    print(f"   🔄 Squashed {len(group_rows)} '{snippet}' notes at ({x:.1f}, {y:.1f})")
-            
-            # Remove duplicate rows while preserving order
-            if rows_to_drop:
-                primary_noteheads = primary_noteheads.drop(rows_to_drop).reset_index(drop=True)
-            
-            # Clean up temporary column
-            primary_noteheads = primary_noteheads.drop('group_key', axis=1)
+            # One line per group is only worth the output with --verbose
+            if args.verbose:
+                for kept_index, group_size in squashed_group_sizes.items():
+                    first_row = svg_df.iloc[kept_positions[kept_index]]
+                    print(f"   🔄 Squashed {group_size + 1} '{first_row['snippet']}' notes "
+                          f"at ({first_row['x']:.1f}, {first_row['y']:.1f})")
             
             if duplicates_squashed > 0:
-                print(f"   📊 Squashed {duplicates_squashed} duplicate noteheads")
+                print(f"   📊 Squashed {duplicates_squashed} duplicate noteheads "
+                      f"in {len(squashed_group_sizes)} groups")
                 print(f"   ✅ Final count: {len(primary_noteheads)} unique notes")
             else:
                 print(f"   ✅ No duplicate noteheads found")
@@ -20,46 +20,118 @@ Input Files:
 
 Output:
 - BWV000_audio.yaml: Audio-synchronized timing data for dynamic tempo playback
+
+YAML is read and written with PyYAML's libyaml bindings (CSafeLoader/CSafeDumper)
+when PyYAML was built against libyaml, and with the pure-Python safe loader otherwise.
 """
 
 import argparse
-import csv
+import hashlib
+import pickle
 import yaml
+import numpy as np
 import pandas as pd
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain, pairwise
 from pathlib import Path
 import sys
 from typing import Dict, List, Optional, Tuple
-import re
 
-def load_noteheads_with_bars(csv_file: Path) -> Dict[str, Dict]:
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+# Prefer the libyaml-backed loader/dumper (C extension) when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+@dataclass(slots=True)
+class Notehead:
+    """Notehead position and bar timing from the noteheads CSV."""
+    snippet: str
+    x: float
+    y: float
+    bar_moment: Optional[str]
+    bar: Optional[float]
+    beat_moment: Optional[str] = None
+
+# Number of flow lines encoded and written at a time when saving
+FLOW_WRITE_CHUNK = 4096
+
+# Where --cache keeps beat mappings between runs
+PIPELINE_CACHE_DIR = Path.home() / '.cache' / 'bwv_zeug'
+
+def _load_yaml(yaml_file: Path, cache: bool = False):
+    """
+    Parse a YAML file from a binary stream with the fastest available safe loader.
+    
+    Args:
+        yaml_file: YAML file to parse
+        cache: Reuse (and store) the parsed data in PIPELINE_CACHE_DIR, keyed on the
+               file's path and checked against its modification time and size
+    
+    Returns:
+        Parsed YAML data
+    """
+    cache_file, cache_signature = _yaml_cache_entry(yaml_file) if cache else (None, None)
+    if cache_file:
+        data = _load_pipeline_cache(cache_file, cache_signature)
+        if data is not None:
+            return data
+    
+    with open(yaml_file, 'rb') as f:
+        data = yaml.load(f, Loader=SafeLoader)
+    
+    if cache_file:
+        _save_pipeline_cache(cache_file, cache_signature, data)
+    return data
+
+def load_noteheads_with_bars(csv_file: Path) -> Dict[str, Notehead]:
     """
     Load notehead data with bar timing from CSV file.
     
     Returns:
         Dictionary mapping data_ref to notehead info including bar timing
     """
-    noteheads = {}
-    
     try:
-        with open(csv_file, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                data_ref = row['data_ref']
-                
-                # Parse bar timing (may be empty strings)
-                bar_moment = row.get('bar_moment', '').strip()
-                bar = row.get('bar', '').strip()
-                
-                noteheads[data_ref] = {
-                    'snippet': row['snippet'],
-                    'x': float(row['x']),
-                    'y': float(row['y']),
-                    'bar_moment': bar_moment if bar_moment else None,
-                    'bar': float(bar) if bar else None
-                }
-                
+        dtype = {'data_ref': str, 'snippet': str, 'x': 'float64', 'y': 'float64',
+                 'bar_moment': str, 'bar': 'float64'}
+        # round_trip parses floats exactly like float()
+        df = pd.read_csv(
+            csv_file,
+            dtype=dtype,
+            keep_default_na=False,
+            na_values={'bar_moment': [''], 'bar': ['']},
+            float_precision='round_trip',
+        )
+        
+        # Bar timing columns are optional and may be empty
+        for column in ('bar_moment', 'bar'):
+            if column not in df.columns:
+                df[column] = pd.Series(np.nan, index=df.index, dtype=object)
+        bar_moments = df['bar_moment'].str.strip().replace('', np.nan)
+        
+        noteheads = {
+            data_ref: Notehead(
+                snippet=snippet,
+                x=x,
+                y=y,
+                bar_moment=bar_moment if isinstance(bar_moment, str) else None,
+                bar=None if pd.isna(bar) else bar
+            )
+            for data_ref, snippet, x, y, bar_moment, bar in zip(
+                df['data_ref'], df['snippet'], df['x'].tolist(), df['y'].tolist(),
+                bar_moments, df['bar'].tolist())
+        }
+        
         print(f"Loaded {len(noteheads)} noteheads from {csv_file}")
-        bar_count = sum(1 for n in noteheads.values() if n['bar_moment'] is not None)
+        # Count after duplicate data_refs have collapsed into the dict (last row wins)
+        bar_count = sum(1 for notehead in noteheads.values() if notehead.bar_moment is not None)
         print(f"Found {bar_count} noteheads with bar timing")
         
         return noteheads
@@ -68,11 +140,10 @@ def load_noteheads_with_bars(csv_file: Path) -> Dict[str, Dict]:
         print(f"Error loading noteheads CSV {csv_file}: {e}")
         return {}
 
-def load_detected_beats(yaml_file: Path) -> List[float]:
-    """Load detected beats from YAML file."""
+def load_detected_beats(yaml_file: Path, cache: bool = False) -> List[float]:
+    """Load detected beats from YAML file (optionally through the parsed YAML cache)."""
     try:
-        with open(yaml_file, 'r') as f:
-            data = yaml.safe_load(f)
+        data = _load_yaml(yaml_file, cache)
         
         # Handle different possible YAML structures
         if 'concatenated' in data and 'beats' in data['concatenated']:
@@ -89,12 +160,11 @@ def load_detected_beats(yaml_file: Path) -> List[float]:
         print(f"Error loading detected beats {yaml_file}: {e}")
         return []
 
-def load_sync_data(yaml_file: Path) -> Dict:
-    """Load existing MIDI-based sync data."""
+def load_sync_data(yaml_file: Path, cache: bool = False) -> Dict:
+    """Load existing MIDI-based sync data (optionally through the parsed YAML cache)."""
     try:
-        with open(yaml_file, 'r') as f:
-            sync_data = yaml.safe_load(f)
-            
+        sync_data = _load_yaml(yaml_file, cache)
+        
         print(f"Loaded sync data from {yaml_file}")
         flow_items = len(sync_data.get('flow', []))
         print(f"Found {flow_items} flow items")
@@ -105,13 +175,57 @@ def load_sync_data(yaml_file: Path) -> Dict:
         print(f"Error loading sync data {yaml_file}: {e}")
         return {}
 
+def _note_flow_items(sync_data: Dict) -> List[list]:
+    """
+    Select the note items of the flow, i.e. those carrying a list of hrefs.
+    
+    Args:
+        sync_data: MIDI sync data with tick timing
+    
+    Returns:
+        List of [start_tick, channel, end_tick, hrefs] flow items
+    """
+    return [flow_item for flow_item in sync_data.get('flow', [])
+            if len(flow_item) >= 4 and isinstance(flow_item[3], list)]
+
+def _build_tick_map(note_flow: List[list], first_wins: bool = False) -> Dict[str, int]:
+    """
+    Build an href -> start tick index over the note items of the flow.
+    
+    Args:
+        note_flow: Note items of the flow, from _note_flow_items
+        first_wins: Map an href found in several flow items to the first of them
+                    (default: the last one)
+    
+    Returns:
+        Dictionary mapping each data_ref to the start tick of its flow item
+    """
+    if first_wins:
+        # Later (earlier in the flow) items overwrite the ones seen before them
+        note_flow = reversed(note_flow)
+    return {href: flow_item[0] for flow_item in note_flow for href in flow_item[3]}
+
+@lru_cache(maxsize=None)
 def parse_moment(moment_str):
     """Parse moment string like '1/4' or '5/4' to decimal."""
-    if '/' in moment_str:
-        num, den = moment_str.split('/')
+    num, sep, den = moment_str.partition('/')
+    if sep:
         return float(num) / float(den)
     return float(moment_str)
 
+@lru_cache(maxsize=None)
+def parse_moment_to_quarters(moment_str):
+    """Parse '1/4' to 1, '5/4' to 5, etc."""
+    num, sep, _ = moment_str.partition('/')
+    if sep:
+        return int(num)
+    return int(float(moment_str) * 4)
+
+@lru_cache(maxsize=None, typed=True)
+def quarters_to_moment(quarters):
+    """Format a quarter count as a moment string, 5 to '5/4' (shared string per count)."""
+    return f"{quarters}/4"
+
 def merge_overlapping_bars(bars_info: Dict) -> Dict:
     """
     Merge bars that start at the same tick position into logical units.
@@ -135,6 +249,7 @@ def merge_overlapping_bars(bars_info: Dict) -> Dict:
     
     print(f"\n🔄 Merging Overlapping Bars:")
     merge_count = 0
+    merge_lines = []  # Written in one go after the loop
     
     for i, tick in enumerate(sorted_ticks):
         bars_at_tick = tick_groups[tick]
@@ -168,6 +283,7 @@ def merge_overlapping_bars(bars_info: Dict) -> Dict:
                 'start_moment': bars_at_tick[0][1]['start_moment'],  # Use first bar's moment
                 'duration_ticks': total_duration_ticks,
                 'duration_beats': total_duration_beats,
+                'ticks_per_beat': total_duration_ticks // total_duration_beats if total_duration_beats else None,
                 'original_bars': original_bars,
                 'noteheads': []
             }
@@ -177,33 +293,27 @@ def merge_overlapping_bars(bars_info: Dict) -> Dict:
                 if 'noteheads' in bar_info:
                     merged_bars[first_bar_num]['noteheads'].extend(bar_info['noteheads'])
             
-            print(f"   Merged bars {original_bars} → Bar {first_bar_num} "
-                  f"(tick {tick}, {total_duration_ticks} ticks = {total_duration_beats} beats)")
+            merge_lines.append(f"   Merged bars {original_bars} → Bar {first_bar_num} "
+                               f"(tick {tick}, {total_duration_ticks} ticks = {total_duration_beats} beats)\n")
             merge_count += 1
     
     # Calculate end moments for merged bars
     sorted_merged = sorted(merged_bars.keys(), key=lambda x: merged_bars[x]['start_tick'])
     
-    for i, bar_id in enumerate(sorted_merged):
-        if i < len(sorted_merged) - 1:
-            # Calculate end moment based on duration
-            current_bar = merged_bars[bar_id]
-            start_moment = parse_moment(current_bar['start_moment'])
-            duration_quarters = current_bar['duration_beats']
-            end_moment_quarter = int(start_moment * 4) + duration_quarters
-            current_bar['end_moment'] = f"{end_moment_quarter}/4"
-        else:
-            # Last bar
-            current_bar = merged_bars[bar_id]
-            start_moment = parse_moment(current_bar['start_moment'])
-            duration_quarters = current_bar['duration_beats']
-            end_moment_quarter = int(start_moment * 4) + duration_quarters
-            current_bar['end_moment'] = f"{end_moment_quarter}/4"
+    for bar_id in sorted_merged:
+        # Calculate end moment based on duration (the same for the last bar)
+        current_bar = merged_bars[bar_id]
+        start_moment = parse_moment(current_bar['start_moment'])
+        duration_quarters = current_bar['duration_beats']
+        end_moment_quarter = int(start_moment * 4) + duration_quarters
+        current_bar['end_moment'] = quarters_to_moment(end_moment_quarter)
     
+    sys.stdout.write(''.join(merge_lines))
     print(f"   ✅ Merged {merge_count} bar groups, total bars after merge: {len(merged_bars)}")
     return merged_bars
 
-def calculate_bar_durations(noteheads: Dict[str, Dict], sync_data: Dict, config_data: Dict = None) -> Dict:
+def calculate_bar_durations(noteheads: Dict[str, Notehead], sync_data: Dict, config_data: Dict = None,
+                            tick_map: Dict[str, int] = None) -> Dict:
     """
     Calculate bar durations in both ticks and beats by analyzing bar structure.
     Now with overlapping bar merging support.
@@ -212,73 +322,63 @@ def calculate_bar_durations(noteheads: Dict[str, Dict], sync_data: Dict, config_
         noteheads: Notehead data with bar timing information
         sync_data: MIDI sync data with tick timing
         config_data: Configuration data (for lastMeasureDuration)
+        tick_map: Prebuilt first-wins href -> start tick index, as built with
+                  _build_tick_map(..., first_wins=True) (built from sync_data if omitted)
     
     Returns:
         Dictionary with merged bar analysis
     """
+    # A data_ref in several flow items anchors its bar at the first of them
+    if tick_map is None:
+        tick_map = _build_tick_map(_note_flow_items(sync_data), first_wins=True)
+    
     # Extract all bars that have noteheads assigned to them
     bars_info = {}
     
+    # Only noteheads with bar timing that appear in the flow contribute to bars
+    tick_lookup = tick_map.get
+    annotated = [(data_ref, notehead.bar, notehead.bar_moment, tick)
+                 for data_ref, notehead in noteheads.items()
+                 if notehead.bar is not None and notehead.bar_moment is not None
+                 and (tick := tick_lookup(data_ref)) is not None]
+    
     # First, collect all bar information from noteheads
-    for data_ref, notehead in noteheads.items():
-        if notehead['bar'] is not None and notehead['bar_moment'] is not None:
-            bar_num = notehead['bar']
-            bar_moment = notehead['bar_moment']
-            
-            # Find corresponding tick information from sync_data
-            # Look for this data_ref in the flow to get tick timing
-            for flow_item in sync_data.get('flow', []):
-                if len(flow_item) >= 4 and isinstance(flow_item[3], list):
-                    if data_ref in flow_item[3]:  # found matching href
-                        start_tick = flow_item[0]
-                        
-                        if bar_num not in bars_info:
-                            bars_info[bar_num] = {
-                                'start_tick': start_tick,
-                                'start_moment': bar_moment,
-                                'noteheads': []
-                            }
-                        
-                        bars_info[bar_num]['noteheads'].append({
-                            'data_ref': data_ref,
-                            'tick': start_tick,
-                            'moment': bar_moment
-                        })
-                        break
+    for data_ref, bar_num, bar_moment, start_tick in annotated:
+        if bar_num not in bars_info:
+            bars_info[bar_num] = {
+                'start_tick': start_tick,
+                'start_moment': bar_moment,
+                'noteheads': []
+            }
+        
+        bars_info[bar_num]['noteheads'].append({
+            'data_ref': data_ref,
+            'tick': start_tick,
+            'moment': bar_moment
+        })
     
     # Sort bars and calculate durations
     sorted_bars = sorted(bars_info.keys())
+    ordered_bars = [bars_info[bar_num] for bar_num in sorted_bars]
     
-    # First, calculate durations for all bars except the last
+    # First, calculate durations for all bars except the last (handled separately)
     standard_duration_ticks = None
     standard_duration_beats = None
     
-    for i, bar_num in enumerate(sorted_bars):
-        if i == len(sorted_bars) - 1:
-            # Last bar - will handle separately
-            continue
-        else:
-            # Calculate duration to next bar
-            next_bar_num = sorted_bars[i + 1]
-            next_bar_info = bars_info[next_bar_num]
-            
-            current_start_tick = bars_info[bar_num]['start_tick']
-            next_start_tick = next_bar_info['start_tick']
-            
-            current_start_moment = parse_moment(bars_info[bar_num]['start_moment'])
-            next_start_moment = parse_moment(next_bar_info['start_moment'])
-            
-            duration_ticks = next_start_tick - current_start_tick
-            duration_beats = int(round((next_start_moment - current_start_moment) * 4))  # Assuming 4/4 time for now
-            
-            bars_info[bar_num]['duration_ticks'] = duration_ticks
-            bars_info[bar_num]['duration_beats'] = duration_beats
-            bars_info[bar_num]['end_moment'] = next_bar_info['start_moment']
-            
-            # Store standard duration for last bar
-            if standard_duration_ticks is None:
-                standard_duration_ticks = duration_ticks
-                standard_duration_beats = duration_beats
+    for bar_info, next_bar_info in pairwise(ordered_bars):
+        # Calculate duration to next bar
+        duration_ticks = next_bar_info['start_tick'] - bar_info['start_tick']
+        duration_beats = int(round((parse_moment(next_bar_info['start_moment'])
+                                    - parse_moment(bar_info['start_moment'])) * 4))  # Assuming 4/4 time for now
+        
+        bar_info['duration_ticks'] = duration_ticks
+        bar_info['duration_beats'] = duration_beats
+        bar_info['end_moment'] = next_bar_info['start_moment']
+        
+        # Store standard duration for last bar
+        if standard_duration_ticks is None:
+            standard_duration_ticks = duration_ticks
+            standard_duration_beats = duration_beats
     
     # Handle last bar: check for lastMeasureDuration in config, otherwise assume same duration as other bars
     if len(sorted_bars) > 0:
@@ -288,12 +388,8 @@ def calculate_bar_durations(noteheads: Dict[str, Dict], sync_data: Dict, config_
         last_measure_duration = None
         if config_data and 'musicalStructure' in config_data and 'lastMeasureDuration' in config_data['musicalStructure']:
             last_measure_duration_str = config_data['musicalStructure']['lastMeasureDuration']
-            # Parse fraction like "3/4"
-            if '/' in str(last_measure_duration_str):
-                num, den = str(last_measure_duration_str).split('/')
-                last_measure_duration = int(num)  # beats in last measure
-            else:
-                last_measure_duration = int(float(last_measure_duration_str) * 4)  # convert to beats
+            # Parse fraction like "3/4" to beats in last measure
+            last_measure_duration = parse_moment_to_quarters(str(last_measure_duration_str))
         
         if standard_duration_ticks is not None:
             if last_measure_duration is not None:
@@ -308,7 +404,7 @@ def calculate_bar_durations(noteheads: Dict[str, Dict], sync_data: Dict, config_
                 # Calculate end moment
                 current_start_moment = parse_moment(bars_info[last_bar_num]['start_moment'])
                 end_moment_quarter = int(current_start_moment * 4) + last_bar_duration_beats
-                bars_info[last_bar_num]['end_moment'] = f"{end_moment_quarter}/4"
+                bars_info[last_bar_num]['end_moment'] = quarters_to_moment(end_moment_quarter)
                 
                 print(f"   Last bar {last_bar_num}: Using config lastMeasureDuration ({last_bar_duration_ticks} ticks = {last_bar_duration_beats} beats)")
             else:
@@ -319,7 +415,7 @@ def calculate_bar_durations(noteheads: Dict[str, Dict], sync_data: Dict, config_
                 # Calculate end moment
                 current_start_moment = parse_moment(bars_info[last_bar_num]['start_moment'])
                 end_moment_quarter = int(current_start_moment * 4) + standard_duration_beats
-                bars_info[last_bar_num]['end_moment'] = f"{end_moment_quarter}/4"
+                bars_info[last_bar_num]['end_moment'] = quarters_to_moment(end_moment_quarter)
                 
                 print(f"   Last bar {last_bar_num}: Assuming standard duration ({standard_duration_ticks} ticks = {standard_duration_beats} beats)")
         else:
@@ -328,20 +424,28 @@ def calculate_bar_durations(noteheads: Dict[str, Dict], sync_data: Dict, config_
             bars_info[last_bar_num]['duration_beats'] = None
             bars_info[last_bar_num]['end_moment'] = None
     
+    # Precompute the beat length of every bar for beat positioning
+    for bar_info in ordered_bars:
+        duration_ticks = bar_info['duration_ticks']
+        duration_beats = bar_info['duration_beats']
+        bar_info['ticks_per_beat'] = duration_ticks // duration_beats if duration_ticks is not None and duration_beats else None
+    
     # Now merge overlapping bars
     merged_bars = merge_overlapping_bars(bars_info)
     
     print(f"\n📊 Bar Analysis (after merging):")
+    analysis_lines = []
     for bar_num in sorted(merged_bars.keys(), key=lambda x: merged_bars[x]['start_tick']):
         info = merged_bars[bar_num]
         original_count = len(info.get('original_bars', [bar_num]))
         if original_count > 1:
-            print(f"   Merged Bar {bar_num}: tick {info['start_tick']}, moment {info['start_moment']}, "
-                  f"duration: {info['duration_ticks']} ticks = {info['duration_beats']} beats "
-                  f"(contains {original_count} original bars)")
+            analysis_lines.append(f"   Merged Bar {bar_num}: tick {info['start_tick']}, moment {info['start_moment']}, "
+                                  f"duration: {info['duration_ticks']} ticks = {info['duration_beats']} beats "
+                                  f"(contains {original_count} original bars)\n")
         else:
-            print(f"   Bar {bar_num}: tick {info['start_tick']}, moment {info['start_moment']}, "
-                  f"duration: {info['duration_ticks']} ticks = {info['duration_beats']} beats")
+            analysis_lines.append(f"   Bar {bar_num}: tick {info['start_tick']}, moment {info['start_moment']}, "
+                                  f"duration: {info['duration_ticks']} ticks = {info['duration_beats']} beats\n")
+    sys.stdout.write(''.join(analysis_lines))
     
     return merged_bars
 
@@ -356,29 +460,19 @@ def calculate_all_beat_positions(merged_bars: Dict, anacrusis_info: Dict = None)
     Returns:
         Sorted list of all theoretical beat tick positions
     """
-    all_beat_ticks = []
+    # Regular bar beats: one arange per bar (bar order doesn't matter, np.unique sorts below)
+    segments = [bar_info['start_tick'] + np.arange(bar_info['duration_beats'], dtype=np.int64) * bar_info['ticks_per_beat']
+                for bar_info in merged_bars.values()
+                if bar_info['duration_ticks'] and bar_info['duration_beats']]
     
     # Add anacrusis beats if present
     if anacrusis_info and anacrusis_info['duration_beats'] > 0:
         ticks_per_beat = 384  # Standard from our analysis
-        for beat in range(anacrusis_info['duration_beats']):
-            beat_tick = anacrusis_info['start_tick'] + (beat * ticks_per_beat)
-            all_beat_ticks.append(beat_tick)
-    
-    # Add regular bar beats
-    for bar_id in sorted(merged_bars.keys(), key=lambda x: merged_bars[x]['start_tick']):
-        bar_info = merged_bars[bar_id]
-        start_tick = bar_info['start_tick']
-        duration_ticks = bar_info['duration_ticks']
-        duration_beats = bar_info['duration_beats']
-        
-        if duration_ticks and duration_beats:
-            ticks_per_beat = duration_ticks // duration_beats
-            for beat in range(duration_beats):
-                beat_tick = start_tick + (beat * ticks_per_beat)
-                all_beat_ticks.append(beat_tick)
+        segments.append(anacrusis_info['start_tick']
+                        + np.arange(anacrusis_info['duration_beats'], dtype=np.int64) * ticks_per_beat)
     
-    all_beat_ticks = sorted(set(all_beat_ticks))  # Remove duplicates and sort
+    # Sorted and deduplicated in one pass over the int64 buffer
+    all_beat_ticks = np.unique(np.concatenate(segments)).tolist() if segments else []
     
     print(f"\n🎯 All Theoretical Beat Positions:")
     print(f"   Total theoretical beats: {len(all_beat_ticks)}")
@@ -389,7 +483,8 @@ def calculate_all_beat_positions(merged_bars: Dict, anacrusis_info: Dict = None)
     
     return all_beat_ticks
 
-def assign_noteheads_to_beats(noteheads: Dict[str, Dict], sync_data: Dict, merged_bars: Dict, anacrusis_info: Dict = None) -> Tuple[Dict[str, Dict], List[Dict]]:
+def assign_noteheads_to_beats(noteheads: Dict[str, Notehead], sync_data: Dict, merged_bars: Dict, anacrusis_info: Dict = None,
+                              tick_map: Dict[str, int] = None, verbose: bool = False) -> Tuple[Dict[str, Notehead], Dict[str, np.ndarray]]:
     """
     Assign beat_moment to each notehead based on its tick position within merged bars.
     
@@ -398,144 +493,122 @@ def assign_noteheads_to_beats(noteheads: Dict[str, Dict], sync_data: Dict, merge
         sync_data: MIDI sync data with tick timing
         merged_bars: Merged bar analysis from calculate_bar_durations
         anacrusis_info: Anacrusis information
+        tick_map: Prebuilt href -> start tick index (built from sync_data if omitted)
+        verbose: Show example assignments
     
     Returns:
-        Tuple of (updated noteheads with beat_moment assigned, beat assignments list)
+        Tuple of (noteheads with beat_moment assigned in place, beat assignments
+        as parallel columns: data_ref, tick, bar, beat_in_bar, beat_moment, on_beat)
     """
-    # Create a mapping from data_ref to tick position
-    tick_map = {}
-    for flow_item in sync_data.get('flow', []):
-        if len(flow_item) >= 4 and isinstance(flow_item[3], list):
-            start_tick = flow_item[0]
-            for href in flow_item[3]:
-                tick_map[href] = start_tick
-    
-    # Parse moment to get quarter note position
-    def parse_moment_to_quarters(moment_str):
-        """Parse '1/4' to 1, '5/4' to 5, etc."""
-        if '/' in moment_str:
-            num, den = moment_str.split('/')
-            return int(num)
-        return int(float(moment_str) * 4)
-    
-    updated_noteheads = noteheads.copy()
-    beat_assignments = []
-    
-    # For each notehead, calculate its beat_moment
-    for data_ref, notehead in updated_noteheads.items():
-        if data_ref not in tick_map:
-            notehead['beat_moment'] = None
-            continue
-            
-        notehead_tick = tick_map[data_ref]
-        
-        # Check if this notehead belongs to anacrusis first
-        if anacrusis_info and anacrusis_info['start_tick'] <= notehead_tick < anacrusis_info['start_tick'] + anacrusis_info['duration_ticks']:
-            # Handle anacrusis
-            ticks_into_anacrusis = notehead_tick - anacrusis_info['start_tick']
-            ticks_per_beat = 384  # Known from our analysis
-            beat_in_anacrusis = ticks_into_anacrusis // ticks_per_beat
-            beat_moment = f"{beat_in_anacrusis}/4"  # 0/4 for first anacrusis beat
-            
-            notehead['beat_moment'] = beat_moment
-            
-            # Check if exactly on beat
-            expected_beat_tick = anacrusis_info['start_tick'] + (beat_in_anacrusis * ticks_per_beat)
-            is_on_beat = (notehead_tick == expected_beat_tick)
-            
-            beat_assignments.append({
-                'data_ref': data_ref,
-                'tick': notehead_tick,
-                'bar': 0.0,  # Anacrusis
-                'beat_in_bar': beat_in_anacrusis,
-                'beat_moment': beat_moment,
-                'on_beat': is_on_beat
-            })
-            continue
-        
-        # Find which merged bar this notehead belongs to
-        assigned_bar = None
-        for bar_id, bar_info in merged_bars.items():
-            if bar_info['duration_ticks'] is None:  # Last bar
-                if notehead_tick >= bar_info['start_tick']:
-                    assigned_bar = bar_id
-                    break
-            else:
-                if bar_info['start_tick'] <= notehead_tick < (bar_info['start_tick'] + bar_info['duration_ticks']):
-                    assigned_bar = bar_id
-                    break
-        
-        if assigned_bar is None:
-            notehead['beat_moment'] = None
-            continue
-            
-        bar_info = merged_bars[assigned_bar]
-        
-        # Skip if bar has no duration info (shouldn't happen now)
-        if bar_info['duration_ticks'] is None or bar_info['duration_beats'] is None:
-            notehead['beat_moment'] = None
-            continue
-        
-        # Calculate beat position within the merged bar
-        ticks_into_bar = notehead_tick - bar_info['start_tick']
-        ticks_per_beat = bar_info['duration_ticks'] // bar_info['duration_beats']
-        beat_in_bar = ticks_into_bar // ticks_per_beat  # 0, 1, 2, 3... for merged bar
-        
-        # Calculate the beat_moment (quarter note position)
-        bar_start_quarter = parse_moment_to_quarters(bar_info['start_moment'])
-        beat_moment_quarter = bar_start_quarter + beat_in_bar
-        beat_moment = f"{beat_moment_quarter}/4"
-        
-        notehead['beat_moment'] = beat_moment
-        
-        # Check if this notehead is exactly on a beat boundary
-        expected_beat_tick = bar_info['start_tick'] + (beat_in_bar * ticks_per_beat)
-        is_on_beat = (notehead_tick == expected_beat_tick)
+    # Mapping from data_ref to tick position
+    if tick_map is None:
+        tick_map = _build_tick_map(_note_flow_items(sync_data))
+    
+    # Ticks of all noteheads present in the flow, in notehead order
+    tick_lookup = tick_map.get
+    located = [(data_ref, tick) for data_ref in noteheads if (tick := tick_lookup(data_ref)) is not None]
+    data_refs = [data_ref for data_ref, _ in located]
+    ticks = np.fromiter((tick for _, tick in located), dtype=np.int64, count=len(located))
+    
+    # Sorted bar boundaries; bars without duration info never get assignments
+    bar_ids = sorted(merged_bars.keys(), key=lambda x: merged_bars[x]['start_tick'])
+    bar_starts = np.array([merged_bars[b]['start_tick'] for b in bar_ids], dtype=np.int64)
+    bar_has_beats = np.array([merged_bars[b]['ticks_per_beat'] is not None for b in bar_ids], dtype=bool)
+    bar_ends = np.array([merged_bars[b]['start_tick'] + merged_bars[b]['duration_ticks'] if bar_has_beats[i]
+                         else np.iinfo(np.int64).max for i, b in enumerate(bar_ids)], dtype=np.int64)
+    bar_ticks_per_beat = np.array([merged_bars[b]['ticks_per_beat'] if bar_has_beats[i] else 1
+                                   for i, b in enumerate(bar_ids)], dtype=np.int64)
+    bar_start_quarters = np.array([parse_moment_to_quarters(merged_bars[b]['start_moment']) for b in bar_ids], dtype=np.int64)
+    bar_numbers = np.array(bar_ids, dtype=np.float64)
+    
+    # Find which merged bar each notehead belongs to
+    if bar_ids:
+        idx = np.searchsorted(bar_starts, ticks, side='right') - 1
+        in_bar = idx >= 0
+        idx[~in_bar] = 0
+        in_bar &= bar_has_beats[idx] & (ticks < bar_ends[idx])
+    else:
+        idx = np.zeros(len(ticks), dtype=np.intp)
+        in_bar = np.zeros(len(ticks), dtype=bool)
+        # No bars at all - index a dummy bar that nothing is assigned to
+        bar_starts = bar_ticks_per_beat = bar_start_quarters = np.ones(1, dtype=np.int64)
+        bar_numbers = np.zeros(1, dtype=np.float64)
+    
+    # Calculate beat position within the merged bar (0, 1, 2, 3... for merged bar)
+    starts = bar_starts[idx]
+    ticks_per_beat = np.where(in_bar, bar_ticks_per_beat[idx], 1)
+    beats_in_bar = (ticks - starts) // ticks_per_beat
+    beat_quarters = bar_start_quarters[idx] + beats_in_bar
+    bars = bar_numbers[idx]
+    
+    # Check if each notehead is exactly on a beat boundary
+    on_beat = ticks == starts + beats_in_bar * ticks_per_beat
+    
+    assigned = in_bar
+    if anacrusis_info:
+        # Noteheads in the anacrusis take precedence over bar assignment
+        anacrusis_start = anacrusis_info['start_tick']
+        in_anacrusis = (anacrusis_start <= ticks) & (ticks < anacrusis_start + anacrusis_info['duration_ticks'])
+        ticks_per_beat = 384  # Known from our analysis
+        beats_in_anacrusis = (ticks - anacrusis_start) // ticks_per_beat
         
-        beat_assignments.append({
-            'data_ref': data_ref,
-            'tick': notehead_tick,
-            'bar': assigned_bar,
-            'beat_in_bar': beat_in_bar,
-            'beat_moment': beat_moment,
-            'on_beat': is_on_beat
-        })
+        beats_in_bar = np.where(in_anacrusis, beats_in_anacrusis, beats_in_bar)
+        beat_quarters = np.where(in_anacrusis, beats_in_anacrusis, beat_quarters)  # 0/4 for first anacrusis beat
+        bars = np.where(in_anacrusis, 0.0, bars)
+        on_beat = np.where(in_anacrusis, ticks == anacrusis_start + beats_in_anacrusis * ticks_per_beat, on_beat)
+        assigned = in_bar | in_anacrusis
+    
+    data_refs = [data_ref for data_ref, keep in zip(data_refs, assigned.tolist()) if keep]
+    beat_moments = [quarters_to_moment(quarter) for quarter in beat_quarters[assigned].tolist()]
+    
+    for notehead in noteheads.values():
+        notehead.beat_moment = None
+    for data_ref, beat_moment in zip(data_refs, beat_moments):
+        noteheads[data_ref].beat_moment = beat_moment
+    
+    beat_assignments = {
+        'data_ref': data_refs,
+        'tick': ticks[assigned],
+        'bar': bars[assigned],
+        'beat_in_bar': beats_in_bar[assigned],
+        'beat_moment': beat_moments,
+        'on_beat': on_beat[assigned]
+    }
+    assigned_count = len(data_refs)
     
     # Display beat assignments
     print(f"\n🎵 Beat Assignment Analysis:")
-    on_beat_count = sum(1 for b in beat_assignments if b['on_beat'])
-    print(f"   Total noteheads processed: {len(beat_assignments)}")
+    on_beat_count = int(beat_assignments['on_beat'].sum())
+    print(f"   Total noteheads processed: {assigned_count}")
     print(f"   Noteheads exactly on beats: {on_beat_count}")
     
     # Show some examples
-    print(f"   Examples:")
-    for assignment in beat_assignments[:10]:  # Show first 10
-        status = "ON BEAT" if assignment['on_beat'] else "off beat"
-        print(f"      Tick {assignment['tick']}: Bar {assignment['bar']}, Beat {assignment['beat_in_bar']}, "
-              f"Moment {assignment['beat_moment']} ({status})")
-    
-    if len(beat_assignments) > 10:
-        print(f"      ... and {len(beat_assignments) - 10} more")
+    if verbose:
+        print(f"   Examples:")
+        for i in range(min(10, assigned_count)):  # Show first 10
+            status = "ON BEAT" if beat_assignments['on_beat'][i] else "off beat"
+            print(f"      Tick {beat_assignments['tick'][i]}: Bar {beat_assignments['bar'][i]}, "
+                  f"Beat {beat_assignments['beat_in_bar'][i]}, Moment {beat_moments[i]} ({status})")
+        
+        if assigned_count > 10:
+            print(f"      ... and {assigned_count - 10} more")
     
-    return updated_noteheads, beat_assignments
+    return noteheads, beat_assignments
 
-def verify_beat_counts_with_interpolation(all_beat_ticks: List[int], detected_beats: List[float], beat_assignments: List[Dict]) -> Dict:
+def verify_beat_counts_with_interpolation(all_beat_ticks: List[int], detected_beats: List[float], beat_assignments: Dict[str, np.ndarray]) -> Dict:
     """
     Verify beat counts using theoretical beats vs detected beats (not notehead beats).
     
     Args:
         all_beat_ticks: All theoretical beat positions
         detected_beats: List of detected audio beats
-        beat_assignments: Beat assignment data for anchoring
+        beat_assignments: Beat assignment columns for anchoring
     
     Returns:
         Verification analysis dictionary
     """
     # Get distinct ticks where noteheads are exactly on beats (for anchoring)
-    notehead_beat_ticks = set()
-    for assignment in beat_assignments:
-        if assignment['on_beat']:
-            notehead_beat_ticks.add(assignment['tick'])
+    notehead_beat_ticks = np.unique(beat_assignments['tick'][beat_assignments['on_beat']]).tolist()
     
     theoretical_beat_count = len(all_beat_ticks)
     detected_beat_count = len(detected_beats)
@@ -573,16 +646,17 @@ def verify_beat_counts_with_interpolation(all_beat_ticks: List[int], detected_be
         'match': match,
         'difference': theoretical_beat_count - detected_beat_count,
         'all_beat_ticks': all_beat_ticks,
-        'anchor_ticks': sorted(notehead_beat_ticks)
+        'anchor_ticks': notehead_beat_ticks
     }
 
-def map_beats_with_interpolation(verification: Dict, detected_beats: List[float]) -> Dict[int, int]:
+def map_beats_with_interpolation(verification: Dict, detected_beats: List[float], verbose: bool = False) -> Dict[int, int]:
     """
     Map all theoretical beats to detected beats using notehead anchors and interpolation.
     
     Args:
         verification: Verification results with theoretical beats and anchors
         detected_beats: List of detected audio beats
+        verbose: Show example beat mappings
     
     Returns:
         Dictionary mapping all theoretical beat ticks -> audio time ticks
@@ -598,34 +672,43 @@ def map_beats_with_interpolation(verification: Dict, detected_beats: List[float]
     print(f"   Mapping {len(all_beat_ticks)} theoretical beats to {len(detected_beats)} detected beats")
     print(f"   Using {len(anchor_ticks)} notehead anchors for interpolation")
     
-    # Create mapping for all beats
-    beat_mapping = {}
+    # Create mapping for all beats onto a millisecond-based tick system
     time_scale_factor = 1000  # 1 tick = 1 millisecond in output
+    new_ticks = np.rint(np.asarray(detected_beats, dtype=np.float64) * time_scale_factor).astype(np.int64)
+    beat_mapping = dict(zip(all_beat_ticks, new_ticks.tolist()))
+    
+    anchor_set = set(anchor_ticks)
     
-    for i, (theoretical_tick, detected_beat_time) in enumerate(zip(all_beat_ticks, detected_beats)):
-        # Map to millisecond-based tick system
-        new_tick = int(round(detected_beat_time * time_scale_factor))
-        beat_mapping[theoretical_tick] = new_tick
-        
-        # Show examples, highlighting anchored vs interpolated beats
-        if i < 10 or i >= len(all_beat_ticks) - 5:
-            is_anchor = theoretical_tick in anchor_ticks
-            status = "ANCHOR" if is_anchor else "INTERP"
-            print(f"   Beat {i:3d}: tick {theoretical_tick:5d} → {new_tick:5d} ({detected_beat_time:.3f}s) [{status}]")
-        elif i == 10:
-            anchor_count = sum(1 for tick in all_beat_ticks[:i] if tick in anchor_ticks)
-            interp_count = i - anchor_count
+    # Show examples (first 10 and last 5), highlighting anchored vs interpolated beats
+    if verbose:
+        mapped_count = min(len(all_beat_ticks), len(detected_beats))
+        tail = range(max(10, len(all_beat_ticks) - 5), mapped_count)
+        
+        def show_beat(i):
+            theoretical_tick = all_beat_ticks[i]
+            status = "ANCHOR" if theoretical_tick in anchor_set else "INTERP"
+            print(f"   Beat {i:3d}: tick {theoretical_tick:5d} → {beat_mapping[theoretical_tick]:5d} "
+                  f"({detected_beats[i]:.3f}s) [{status}]")
+        
+        for i in range(min(10, mapped_count)):
+            show_beat(i)
+        if tail and tail[0] > 10:
+            anchor_count = sum(1 for tick in all_beat_ticks[:10] if tick in anchor_set)
+            interp_count = 10 - anchor_count
             print(f"   ... showing {anchor_count} anchors, {interp_count} interpolated ...")
+        for i in tail:
+            show_beat(i)
     
     # Show interpolation statistics
-    total_anchors = sum(1 for tick in all_beat_ticks if tick in anchor_ticks)
+    total_anchors = sum(1 for tick in all_beat_ticks if tick in anchor_set)
     total_interpolated = len(all_beat_ticks) - total_anchors
     
     print(f"   📊 Final mapping: {total_anchors} anchored + {total_interpolated} interpolated = {len(beat_mapping)} total beats")
     
     return beat_mapping
 
-def interpolate_non_beat_ticks(sync_data: Dict, beat_tick_mapping: Dict[int, int]) -> Dict[int, int]:
+def interpolate_non_beat_ticks(sync_data: Dict, beat_tick_mapping: Dict[int, int], verbose: bool = False,
+                               note_flow: List[list] = None) -> Dict[int, int]:
     """
     Interpolate new tick values for noteheads that are not exactly on beats.
     
@@ -634,27 +717,29 @@ def interpolate_non_beat_ticks(sync_data: Dict, beat_tick_mapping: Dict[int, int
     Args:
         sync_data: MIDI sync data with tick timing
         beat_tick_mapping: Dictionary mapping old_tick -> new_tick for beat positions
+        verbose: Show example interpolations
+        note_flow: Prefiltered note items of the flow (selected from sync_data if omitted)
     
     Returns:
         Complete tick mapping (beat ticks + interpolated ticks)
     """
-    # Get all ticks from sync data
-    all_ticks = set()
-    for flow_item in sync_data.get('flow', []):
-        if len(flow_item) >= 4 and isinstance(flow_item[3], list):
-            all_ticks.add(flow_item[0])  # start tick
-            if flow_item[1] is not None:  # not a bar marker
-                all_ticks.add(flow_item[2])  # end tick
+    if note_flow is None:
+        note_flow = _note_flow_items(sync_data)
+    
+    # Get all start and end ticks (bar markers have no end tick) from sync data
+    start_ticks = np.fromiter((flow_item[0] for flow_item in note_flow), dtype=np.int64, count=len(note_flow))
+    end_ticks = np.fromiter((flow_item[2] for flow_item in note_flow
+                             if flow_item[1] is not None and flow_item[2] is not None), dtype=np.int64)
+    all_ticks = np.unique(np.concatenate([start_ticks, end_ticks]))
     
     # Sort beat ticks for interpolation bounds
-    beat_ticks = sorted(beat_tick_mapping.keys())
-    complete_mapping = beat_tick_mapping.copy()
+    beat_old = np.fromiter(beat_tick_mapping.keys(), dtype=np.int64, count=len(beat_tick_mapping))
+    beat_old.sort()
+    beat_ticks = beat_old.tolist()
     
-    # Find ticks that need interpolation
-    non_beat_ticks = []
-    for tick in all_ticks:
-        if tick not in beat_tick_mapping:
-            non_beat_ticks.append(tick)
+    # Find ticks that need interpolation (sorted, as both inputs are unique)
+    old_ticks = np.setdiff1d(all_ticks, beat_old, assume_unique=True)
+    non_beat_ticks = old_ticks.tolist()
     
     print(f"\n🔄 Interpolating Non-Beat Ticks:")
     print(f"   Beat ticks (anchors): {len(beat_ticks)}")
@@ -662,131 +747,82 @@ def interpolate_non_beat_ticks(sync_data: Dict, beat_tick_mapping: Dict[int, int
     
     interpolated_count = 0
     
-    for old_tick in sorted(non_beat_ticks):
-        # Find surrounding beat ticks O0 and O1
-        o0_tick = None
-        o1_tick = None
-        
-        for i, beat_tick in enumerate(beat_ticks):
-            if beat_tick <= old_tick:
-                o0_tick = beat_tick
-            elif beat_tick > old_tick and o1_tick is None:
-                o1_tick = beat_tick
-                break
-        
-        if o0_tick is None or o1_tick is None:
-            # Handle edge cases (before first beat or after last beat)
-            if o0_tick is None:
-                # Before first beat - extrapolate backwards
-                if len(beat_ticks) >= 2:
-                    o0_tick = beat_ticks[0]
-                    o1_tick = beat_ticks[1]
-                    # Use extrapolation logic
-                else:
-                    complete_mapping[old_tick] = old_tick  # Fallback
-                    continue
-            elif o1_tick is None:
-                # After last beat - extrapolate forwards
-                if len(beat_ticks) >= 2:
-                    o0_tick = beat_ticks[-2]
-                    o1_tick = beat_ticks[-1]
-                    # Use extrapolation logic
-                else:
-                    complete_mapping[old_tick] = old_tick  # Fallback
-                    continue
-        
-        # Get old and new tick values for anchors
-        o0_old = o0_tick
-        o1_old = o1_tick
-        o0_new = beat_tick_mapping[o0_tick]
-        o1_new = beat_tick_mapping[o1_tick]
-        
-        # Apply interpolation formula
-        if o1_old != o0_old:  # Avoid division by zero
-            # (N.newtick - O0.newtick) / (O1.newtick - O0.newtick) = (N.oldtick - O0.oldtick) / (O1.oldtick - O0.oldtick)
-            old_ratio = (old_tick - o0_old) / (o1_old - o0_old)
-            new_tick = o0_new + int(round(old_ratio * (o1_new - o0_new)))
-        else:
-            new_tick = o0_new  # Same position
+    # Not enough anchors to interpolate between - keep ticks as they are
+    new_tick_values = non_beat_ticks
+    
+    if len(beat_ticks) >= 2 and non_beat_ticks:
+        beat_new = np.asarray([beat_tick_mapping[t] for t in beat_ticks], dtype=np.int64)
+        
+        # Find surrounding beat ticks O0 and O1; ticks before the first or
+        # after the last beat extrapolate from the outermost pair of beats
+        idx = np.searchsorted(beat_old, old_ticks, side='right') - 1
+        idx = np.clip(idx, 0, len(beat_old) - 2)
+        o0_old, o1_old = beat_old[idx], beat_old[idx + 1]
+        o0_new, o1_new = beat_new[idx], beat_new[idx + 1]
+        
+        # (N.newtick - O0.newtick) / (O1.newtick - O0.newtick) = (N.oldtick - O0.oldtick) / (O1.oldtick - O0.oldtick)
+        old_ratio = (old_ticks - o0_old) / (o1_old - o0_old)
+        new_ticks = o0_new + np.rint(old_ratio * (o1_new - o0_new)).astype(np.int64)
         
-        complete_mapping[old_tick] = new_tick
-        interpolated_count += 1
+        new_tick_values = new_ticks.tolist()
+        interpolated_count = len(non_beat_ticks)
         
         # Show some examples
-        if interpolated_count <= 10:
-            print(f"   Tick {old_tick:5d} → {new_tick:5d} (between {o0_old}-{o1_old} → {o0_new}-{o1_new})")
-        elif interpolated_count == 11:
-            print(f"   ... and {len(non_beat_ticks) - 10} more interpolations")
+        if verbose:
+            for i in range(min(10, interpolated_count)):
+                print(f"   Tick {non_beat_ticks[i]:5d} → {int(new_ticks[i]):5d} "
+                      f"(between {o0_old[i]}-{o1_old[i]} → {o0_new[i]}-{o1_new[i]})")
+            if interpolated_count > 10:
+                print(f"   ... and {interpolated_count - 10} more interpolations")
     
     print(f"   ✅ Interpolated {interpolated_count} non-beat ticks")
     
+    # Build the complete mapping in one go: beat ticks first, then interpolated ticks
+    complete_mapping = dict(zip(chain(beat_tick_mapping.keys(), non_beat_ticks),
+                                chain(beat_tick_mapping.values(), new_tick_values)))
+    
     return complete_mapping
 
-def apply_tick_mappings_to_flow(sync_data: Dict, complete_tick_mapping: Dict[int, int], detected_beats: List[float] = None) -> Dict:
+def _remap_ticks(ticks: np.ndarray, old_ticks: np.ndarray, new_ticks: np.ndarray) -> np.ndarray:
     """
-    Apply complete tick mappings to create final audio-synced flow data.
+    Map ticks through sorted old -> new tick arrays; ticks without a mapping stay as they are.
+    
+    Args:
+        ticks: Ticks to remap
+        old_ticks: Sorted mapped ticks
+        new_ticks: New tick for each entry of old_ticks
+    
+    Returns:
+        Remapped ticks
+    """
+    if len(old_ticks) == 0:
+        return ticks.copy()
+    idx = np.searchsorted(old_ticks, ticks).clip(max=len(old_ticks) - 1)
+    return np.where(old_ticks[idx] == ticks, new_ticks[idx], ticks)
+
+def _audio_sync_data(sync_data: Dict, new_flow: list, complete_tick_mapping: Dict[int, int],
+                     detected_beats: List[float] = None) -> Dict:
+    """
+    Build the audio-synced sync data around a transformed flow and update its metadata.
     
     Args:
         sync_data: Original MIDI sync data
+        new_flow: Transformed flow items
         complete_tick_mapping: Complete mapping from old_tick -> new_tick
         detected_beats: List of detected beats for metadata updates
     
     Returns:
-        Audio-synced sync data with transformed timing
+        Audio-synced sync data
     """
-    audio_sync_data = sync_data.copy()
-    
-    if 'flow' not in audio_sync_data:
-        return audio_sync_data
-    
-    print(f"\n🔄 Applying Tick Mappings to Flow Data:")
-    print(f"   Total tick mappings available: {len(complete_tick_mapping)}")
-    
-    transformed_items = 0
-    unchanged_items = 0
-    
-    # Transform each flow item
-    for i, flow_item in enumerate(audio_sync_data['flow']):
-        if len(flow_item) >= 4:
-            start_tick = flow_item[0]
-            channel = flow_item[1]
-            end_tick = flow_item[2]
-            info = flow_item[3]
-            
-            # Transform start tick
-            new_start_tick = complete_tick_mapping.get(start_tick, start_tick)
-            
-            # Transform end tick (if not None and not a bar marker)
-            if channel is not None and end_tick is not None:
-                new_end_tick = complete_tick_mapping.get(end_tick, end_tick)
-            else:
-                new_end_tick = end_tick
-            
-            # Update flow item
-            audio_sync_data['flow'][i] = [new_start_tick, channel, new_end_tick, info]
-            
-            # Track changes
-            if new_start_tick != start_tick or (new_end_tick != end_tick and end_tick is not None):
-                transformed_items += 1
-                
-                # Show some examples of transformations
-                if transformed_items <= 5:
-                    if end_tick is not None:
-                        print(f"   Item {i}: [{start_tick}, {channel}, {end_tick}] → [{new_start_tick}, {channel}, {new_end_tick}]")
-                    else:
-                        print(f"   Item {i}: [{start_tick}, {channel}, {end_tick}] → [{new_start_tick}, {channel}, {new_end_tick}]")
-                elif transformed_items == 6:
-                    print(f"   ... and {len(audio_sync_data['flow']) - 5} more transformations")
-            else:
-                unchanged_items += 1
-    
-    print(f"   ✅ Transformed {transformed_items} flow items")
-    print(f"   📌 {unchanged_items} items unchanged (no mapping needed)")
+    # New sync data sharing everything but flow and meta with the caller's
+    audio_sync_data = {**sync_data, 'flow': new_flow}
     
     # Remove tickToSecondRatio from metadata as it's no longer relevant
-    if 'meta' in audio_sync_data and 'tickToSecondRatio' in audio_sync_data['meta']:
-        del audio_sync_data['meta']['tickToSecondRatio']
-        print(f"   🗑️  Removed obsolete tickToSecondRatio from metadata")
+    meta = sync_data.get('meta')
+    if isinstance(meta, dict):
+        audio_sync_data['meta'] = {k: v for k, v in meta.items() if k != 'tickToSecondRatio'}
+        if 'tickToSecondRatio' in meta:
+            print(f"   🗑️  Removed obsolete tickToSecondRatio from metadata")
     
     # Update metadata to reflect new time-based tick system
     if 'meta' in audio_sync_data and complete_tick_mapping:
@@ -804,52 +840,219 @@ def apply_tick_mappings_to_flow(sync_data: Dict, complete_tick_mapping: Dict[int
     
     return audio_sync_data
 
+def apply_tick_mappings_to_flow(sync_data: Dict, complete_tick_mapping: Dict[int, int], detected_beats: List[float] = None,
+                                verbose: bool = False) -> Dict:
+    """
+    Apply complete tick mappings to create final audio-synced flow data.
+    
+    Args:
+        sync_data: Original MIDI sync data
+        complete_tick_mapping: Complete mapping from old_tick -> new_tick
+        detected_beats: List of detected beats for metadata updates
+        verbose: Show example transformations
+    
+    Returns:
+        Audio-synced sync data with transformed timing
+    """
+    if 'flow' not in sync_data:
+        return dict(sync_data)
+    
+    print(f"\n🔄 Applying Tick Mappings to Flow Data:")
+    print(f"   Total tick mappings available: {len(complete_tick_mapping)}")
+    
+    flow = sync_data['flow']
+    note_rows = [i for i, flow_item in enumerate(flow) if len(flow_item) >= 4]
+    # Sorted old_tick -> new_tick arrays for the vectorized remap
+    old_ticks = np.fromiter(complete_tick_mapping.keys(), dtype=np.int64, count=len(complete_tick_mapping))
+    new_ticks = np.fromiter(complete_tick_mapping.values(), dtype=np.int64, count=len(complete_tick_mapping))
+    
+    if np.array_equal(old_ticks, new_ticks):
+        # Empty or identity mapping: keep the flow ticks as they are and only refresh the metadata
+        print(f"   ✅ Transformed 0 flow items")
+        print(f"   📌 {len(note_rows)} items unchanged (no mapping needed)")
+        new_flow = list(flow)
+        for i in note_rows:
+            new_flow[i] = tuple(flow[i][:4])
+        return _audio_sync_data(sync_data, new_flow, complete_tick_mapping, detected_beats)
+    
+    order = np.argsort(old_ticks)
+    old_ticks, new_ticks = old_ticks[order], new_ticks[order]
+    
+    starts = np.fromiter((flow[i][0] for i in note_rows), dtype=np.int64, count=len(note_rows))
+    # End ticks are only transformed for notes, not for bar markers
+    has_end = np.fromiter((flow[i][1] is not None and flow[i][2] is not None for i in note_rows),
+                          dtype=bool, count=len(note_rows))
+    ends = np.fromiter((flow[i][2] if has_end[k] else 0 for k, i in enumerate(note_rows)),
+                       dtype=np.int64, count=len(note_rows))
+    
+    new_starts = _remap_ticks(starts, old_ticks, new_ticks)
+    new_ends = np.where(has_end, _remap_ticks(ends, old_ticks, new_ticks), ends)
+    changed = (new_starts != starts) | (new_ends != ends)
+    
+    # Transform each flow item (as immutable tuples, they are only written out from here)
+    new_flow = list(flow)
+    for i, new_start_tick, new_end_tick, end_mapped in zip(note_rows, new_starts.tolist(), new_ends.tolist(), has_end.tolist()):
+        start_tick, channel, end_tick, info = flow[i][:4]
+        new_flow[i] = (new_start_tick, channel, new_end_tick if end_mapped else end_tick, info)
+    
+    transformed_items = int(changed.sum())
+    unchanged_items = len(note_rows) - transformed_items
+    
+    # Show some examples of transformations
+    if verbose:
+        for k in np.flatnonzero(changed)[:5].tolist():
+            i = note_rows[k]
+            print(f"   Item {i}: [{flow[i][0]}, {flow[i][1]}, {flow[i][2]}] → "
+                  f"[{new_flow[i][0]}, {new_flow[i][1]}, {new_flow[i][2]}]")
+        if transformed_items > 5:
+            print(f"   ... and {len(flow) - 5} more transformations")
+    
+    print(f"   ✅ Transformed {transformed_items} flow items")
+    print(f"   📌 {unchanged_items} items unchanged (no mapping needed)")
+    
+    return _audio_sync_data(sync_data, new_flow, complete_tick_mapping, detected_beats)
+
+def _format_flow_list(val: list) -> str:
+    """Format a list of hrefs with single quotes for strings."""
+    formatted_list = [f"'{v}'" if isinstance(v, str) else str(v) for v in val]
+    return f"[{', '.join(formatted_list)}]"
+
+# Formatter per exact value type found in flow items
+_FLOW_VALUE_FORMATTERS = {
+    type(None): lambda val: '~',
+    list: _format_flow_list,
+    int: str,
+    float: str,
+    str: str,
+    bool: str,
+}
+
+def _format_flow_value(val) -> str:
+    """Format one flow item value like the original sync YAML (~ for null, quoted hrefs)."""
+    formatter = _FLOW_VALUE_FORMATTERS.get(type(val))
+    if formatter is not None:
+        return formatter(val)
+    # Subclasses and unexpected types
+    if isinstance(val, list):
+        return _format_flow_list(val)
+    return str(val)
+
+def _format_flow_line(item) -> str:
+    """Format one flow item as a compact YAML array line."""
+    # Fast path for the common note row: int ticks and channel plus a non-empty list of hrefs
+    if len(item) == 4 and type(item[3]) is list:
+        start, channel, end, hrefs = item
+        if (type(start) is int and type(channel) is int and type(end) is int
+                and hrefs and all(type(href) is str for href in hrefs)):
+            return "- [%d, %d, %d, ['%s']]\n" % (start, channel, end, "', '".join(hrefs))
+    return f"- [{', '.join(map(_format_flow_value, item))}]\n"
+
 def save_audio_synced_yaml(audio_sync_data: Dict, output_yaml: Path):
     """Save audio-synced data to YAML file with proper formatting."""
     try:
-        with open(output_yaml, 'w') as f:
+        with open(output_yaml, 'wb', buffering=1 << 20) as f:
             # Write meta section normally
             meta_data = {k: v for k, v in audio_sync_data.items() if k != 'flow'}
-            yaml_content = yaml.dump(meta_data, default_flow_style=False, sort_keys=False)
-            f.write(yaml_content)
+            yaml_content = yaml.dump(meta_data, Dumper=SafeDumper, default_flow_style=False, sort_keys=False)
+            f.write(yaml_content.encode('utf-8'))
             
-            # Write flow section with custom formatting to match original
-            f.write('flow:\n')
-            for item in audio_sync_data.get('flow', []):
-                # Format each flow item as compact array like original
-                # Handle null values (~ in YAML)
-                formatted_item = []
-                for val in item:
-                    if val is None:
-                        formatted_item.append('~')
-                    elif isinstance(val, list):
-                        # Format list with single quotes for strings
-                        formatted_list = [f"'{str(v)}'" if isinstance(v, str) else str(v) for v in val]
-                        formatted_item.append(f"[{', '.join(formatted_list)}]")
-                    else:
-                        formatted_item.append(str(val))
-                
-                f.write(f"- [{', '.join(formatted_item)}]\n")
+            # Write flow section with custom formatting to match original,
+            # one compact array line per flow item, encoded in chunks of lines
+            f.write(b'flow:\n')
+            flow = audio_sync_data.get('flow', [])
+            for chunk_start in range(0, len(flow), FLOW_WRITE_CHUNK):
+                lines = [_format_flow_line(item) for item in flow[chunk_start:chunk_start + FLOW_WRITE_CHUNK]]
+                f.write(''.join(lines).encode('utf-8'))
         print(f"✅ Audio sync data saved to {output_yaml}")
         
     except Exception as e:
         print(f"Error saving output: {e}")
         raise
 
+def save_audio_synced_json(audio_sync_data: Dict, output_json: Path):
+    """Save audio-synced data as a JSON sidecar for downstream tools (orjson when available)."""
+    try:
+        if orjson is not None:
+            # meta.channels is keyed by channel number; JSON turns keys into strings
+            output_json.write_bytes(orjson.dumps(audio_sync_data, option=orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(output_json, 'w', encoding='utf-8') as f:
+                json.dump(audio_sync_data, f, separators=(',', ':'))
+        print(f"✅ Audio sync JSON saved to {output_json}")
+        
+    except Exception as e:
+        print(f"Error saving JSON output: {e}")
+        raise
+
 def load_config_data(config_file: Path) -> Dict:
     """Load configuration data from YAML file."""
+    if not config_file:
+        print(f"Config file not provided or doesn't exist: {config_file}")
+        return {}
     try:
-        if config_file and config_file.exists():
-            with open(config_file, 'r') as f:
-                config_data = yaml.safe_load(f)
-            print(f"Loaded config data from {config_file}")
-            return config_data
-        else:
-            print(f"Config file not provided or doesn't exist: {config_file}")
-            return {}
+        config_data = _load_yaml(config_file)
+    except FileNotFoundError:
+        print(f"Config file not provided or doesn't exist: {config_file}")
+        return {}
     except Exception as e:
         print(f"Warning: Error loading config file {config_file}: {e}")
         return {}
+    print(f"Loaded config data from {config_file}")
+    return config_data
+
+def _pipeline_cache_entry(input_files: List[Optional[Path]]) -> Tuple[Path, str]:
+    """
+    Get the cache file and signature for the beat mapping computed from the given input files.
+    
+    The file name is keyed on the inputs' resolved paths only, so a run on regenerated
+    inputs overwrites the same entry. The signature covers each input's modification
+    time and size, plus this script, so editing any of them invalidates the cached mapping.
+    
+    Args:
+        input_files: Input files of the run (None for an omitted optional file; missing files count as omitted)
+    
+    Returns:
+        Path of the pickle file in PIPELINE_CACHE_DIR, and the inputs' signature
+    """
+    key = hashlib.sha1()
+    signature = []
+    for path in [*input_files, Path(__file__)]:
+        try:
+            stat = path.stat() if path is not None else None
+        except FileNotFoundError:
+            stat = None  # e.g. a --config file that doesn't exist
+        key.update(f"{path.resolve() if path is not None else '-'}|".encode())
+        signature.append(f"{stat.st_mtime_ns}:{stat.st_size}" if stat is not None else '-')
+    return PIPELINE_CACHE_DIR / f"sync_with_audio-{key.hexdigest()}.pickle", '|'.join(signature)
+
+def _yaml_cache_entry(yaml_file: Path) -> Tuple[Path, str]:
+    """Get the cache file (keyed on the resolved path) and signature for a parsed YAML input file."""
+    stat = yaml_file.stat()
+    key = hashlib.sha1(str(yaml_file.resolve()).encode())
+    return PIPELINE_CACHE_DIR / f"yaml-{key.hexdigest()}.pickle", f"{stat.st_mtime_ns}:{stat.st_size}"
+
+def _load_pipeline_cache(cache_file: Path, signature: str):
+    """Load cached data (beat mapping or parsed YAML), or None if unavailable or stale."""
+    try:
+        with open(cache_file, 'rb') as f:
+            cached_signature, cached = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable cache file {cache_file}: {e}")
+        return None
+    return cached if cached_signature == signature else None
+
+def _save_pipeline_cache(cache_file: Path, signature: str, cached):
+    """Store cached data (beat mapping or parsed YAML) for later runs, replacing any stale entry."""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'wb') as f:
+            pickle.dump((signature, cached), f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_file.replace(cache_file)
+    except Exception as e:
+        print(f"Warning: Could not write cache file {cache_file}: {e}")
 
 def main():
     parser = argparse.ArgumentParser(description='Generate audio-synchronized timing data for dynamic tempo playback')
@@ -859,8 +1062,16 @@ def main():
     parser.add_argument('-c', '--config', help='Configuration YAML file (optional)')
     parser.add_argument('-o', '--output', help='Output audio-synced YAML file (default: sync_yaml with _audio suffix)')
     parser.add_argument('--debug', action='store_true', help='Enable debug output')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show example beat assignments and tick mappings')
+    parser.add_argument('--json-output', action='store_true',
+                        help='Also write the audio-synced data as JSON next to the YAML output (.json suffix)')
+    parser.add_argument('--cache', action='store_true',
+                        help=f'Reuse the parsed YAML inputs and beat mapping of a previous run with unchanged inputs '
+                             f'(stored in {PIPELINE_CACHE_DIR})')
     
     args = parser.parse_args()
+    # Debug output includes the per-step examples
+    verbose = args.verbose or args.debug
     
     noteheads_csv = Path(args.noteheads_csv)
     sync_yaml = Path(args.sync_yaml)
@@ -885,61 +1096,81 @@ def main():
     # Load input data
     print("Loading input data...")
     noteheads = load_noteheads_with_bars(noteheads_csv)
-    sync_data = load_sync_data(sync_yaml)
-    detected_beats = load_detected_beats(beats_yaml)
+    sync_data = load_sync_data(sync_yaml, args.cache)
+    detected_beats = load_detected_beats(beats_yaml, args.cache)
     config_data = load_config_data(config_file)
     
     if not noteheads or not sync_data or not detected_beats:
         print("Error: Failed to load required input data")
         sys.exit(1)
     
-    print("\n🔧 Implementing interpolation-based beat mapping...")
-    
-    # Step 1: Calculate bar durations with merging to understand beat structure
-    print("Step 1: Analyzing bar structure and calculating beat durations...")
-    merged_bars = calculate_bar_durations(noteheads, sync_data, config_data)
-    
-    # Step 1b: Calculate anacrusis (pickup bar) information
-    print("Step 1b: Analyzing anacrusis (pickup bar)...")
-    # Simple implementation - no anacrusis detected for this piece
-    anacrusis_info = None
-    
-    # Step 2: Calculate ALL theoretical beat positions
-    print("Step 2: Calculating all theoretical beat positions...")
-    all_beat_ticks = calculate_all_beat_positions(merged_bars, anacrusis_info)
-    
-    # Step 3: Assign noteheads to beats for anchoring
-    print("Step 3: Assigning noteheads to beats for anchoring...")
-    _, beat_assignments = assign_noteheads_to_beats(noteheads, sync_data, merged_bars, anacrusis_info)
-    
-    # Step 4: Verify theoretical beats vs detected beats
-    print("Step 4: Verifying theoretical vs detected beat counts...")
-    verification = verify_beat_counts_with_interpolation(all_beat_ticks, detected_beats, beat_assignments)
-    
-    if not verification['match']:
-        print("❌ Beat count mismatch - cannot proceed with beat mapping")
-        sys.exit(1)
+    cache_file, cache_signature = (
+        _pipeline_cache_entry([noteheads_csv, sync_yaml, beats_yaml, config_file]) if args.cache else (None, None)
+    )
+    cached = _load_pipeline_cache(cache_file, cache_signature) if cache_file else None
     
-    # Step 5: Map all theoretical beats to detected beats using interpolation
-    print("Step 5: Mapping theoretical beats to detected beats...")
-    beat_tick_mapping = map_beats_with_interpolation(verification, detected_beats)
-    
-    # Step 6: Interpolate tick mappings for non-beat noteheads
-    print("Step 6: Interpolating ticks for noteheads between beats...")
-    complete_tick_mapping = interpolate_non_beat_ticks(sync_data, beat_tick_mapping)
+    if cached is not None:
+        verification, complete_tick_mapping = cached
+        print(f"\n♻️  Reusing cached beat mapping (Steps 1-6) from {cache_file}")
+    else:
+        print("\n🔧 Implementing interpolation-based beat mapping...")
+        
+        # Step 1: Calculate bar durations with merging to understand beat structure
+        print("Step 1: Analyzing bar structure and calculating beat durations...")
+        note_flow = _note_flow_items(sync_data)
+        tick_map = _build_tick_map(note_flow)
+        merged_bars = calculate_bar_durations(noteheads, sync_data, config_data,
+                                              _build_tick_map(note_flow, first_wins=True))
+        
+        # Step 1b: Calculate anacrusis (pickup bar) information
+        print("Step 1b: Analyzing anacrusis (pickup bar)...")
+        # Simple implementation - no anacrusis detected for this piece
+        anacrusis_info = None
+        
+        # Step 2: Calculate ALL theoretical beat positions
+        print("Step 2: Calculating all theoretical beat positions...")
+        all_beat_ticks = calculate_all_beat_positions(merged_bars, anacrusis_info)
+        
+        # Step 3: Assign noteheads to beats for anchoring
+        print("Step 3: Assigning noteheads to beats for anchoring...")
+        _, beat_assignments = assign_noteheads_to_beats(noteheads, sync_data, merged_bars, anacrusis_info, tick_map,
+                                                        verbose=verbose)
+        
+        # Step 4: Verify theoretical beats vs detected beats
+        print("Step 4: Verifying theoretical vs detected beat counts...")
+        verification = verify_beat_counts_with_interpolation(all_beat_ticks, detected_beats, beat_assignments)
+        
+        if not verification['match']:
+            print("❌ Beat count mismatch - cannot proceed with beat mapping")
+            sys.exit(1)
+        
+        # Step 5: Map all theoretical beats to detected beats using interpolation
+        print("Step 5: Mapping theoretical beats to detected beats...")
+        beat_tick_mapping = map_beats_with_interpolation(verification, detected_beats, verbose=verbose)
+        
+        # Step 6: Interpolate tick mappings for non-beat noteheads
+        print("Step 6: Interpolating ticks for noteheads between beats...")
+        complete_tick_mapping = interpolate_non_beat_ticks(sync_data, beat_tick_mapping, verbose=verbose,
+                                                           note_flow=note_flow)
+        
+        if cache_file:
+            _save_pipeline_cache(cache_file, cache_signature, (verification, complete_tick_mapping))
     
     # Step 7: Apply complete tick mappings to create final audio-synced YAML
     print("Step 7: Applying complete tick mappings to create audio-synced YAML...")
-    audio_sync_data = apply_tick_mappings_to_flow(sync_data, complete_tick_mapping, detected_beats)
+    audio_sync_data = apply_tick_mappings_to_flow(sync_data, complete_tick_mapping, detected_beats,
+                                                  verbose=verbose)
     
     # Save audio-synced data
     print(f"\nSaving audio-synced data to {output_yaml}...")
     save_audio_synced_yaml(audio_sync_data, output_yaml)
+    if args.json_output:
+        save_audio_synced_json(audio_sync_data, output_yaml.with_suffix('.json'))
     
     # Display summary
     original_items = len(sync_data.get('flow', []))
     audio_items = len(audio_sync_data.get('flow', []))
-    bar_count = sum(1 for n in noteheads.values() if n['bar_moment'] is not None)
+    bar_count = sum(1 for n in noteheads.values() if n.bar_moment is not None)
     
     print(f"\n📊 Summary:")
     print(f"   Original flow items: {original_items}")
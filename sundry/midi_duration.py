@@ -2,6 +2,16 @@ import mido
 
 mid = mido.MidiFile('bwv1006_ly_one_line.midi')
 
-# Total time in seconds
-total_time = sum(msg.time for msg in mid if not msg.is_meta)
+# Total time in seconds: sum the non-meta delta times, converting ticks with the
+# tempo in effect, as iterating the MidiFile does but without copying every message
+if mid.type == 2:
+    raise TypeError("can't merge tracks in type 2 (asynchronous) file")
+tempo = 500000  # MIDI default tempo (120 bpm) until the first set_tempo
+total_time = 0
+for msg in mido.merge_tracks(mid.tracks, skip_checks=True):
+    if not msg.is_meta:
+        if msg.time > 0:
+            total_time += mido.tick2second(msg.time, mid.ticks_per_beat, tempo)
+    elif msg.type == 'set_tempo':
+        tempo = msg.tempo
 print(f"Duration: {total_time:.2f} seconds")
@@ -23,18 +23,21 @@ pan_by_channel = {
 # Load MIDI file
 mid = MidiFile(input_file)
 for i, track in enumerate(mid.tracks):
-    new_track = MidiTrack()
-    used_channels = set()
-
-    for msg in track:
-        # Inject pan message once per channel
-        if msg.type in ('note_on', 'program_change') and msg.channel not in used_channels:
+    # Find the first note_on/program_change of each panned channel, reporting
+    # every such message's channel until that channel has been panned
+    first_index = {}
+    for index, msg in enumerate(track):
+        if msg.type in ('note_on', 'program_change') and msg.channel not in first_index:
             print(msg.channel)
-            pan = pan_by_channel.get(msg.channel)
-            if pan is not None:
-                new_track.append(Message('control_change', control=10, value=pan, channel=msg.channel, time=0))
-                used_channels.add(msg.channel)
-        new_track.append(msg)
+            if msg.channel in pan_by_channel:
+                first_index[msg.channel] = index
+
+    # Copy the track once and inject a pan message right before each of those,
+    # inserting from the back so earlier indices stay valid
+    injections = sorted((index, channel) for channel, index in first_index.items())
+    new_track = MidiTrack(track)
+    for index, channel in reversed(injections):
+        new_track.insert(index, Message('control_change', control=10, value=pan_by_channel[channel], channel=channel, time=0))
 
     mid.tracks[i] = new_track
 
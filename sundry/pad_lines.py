@@ -8,11 +8,13 @@ filename = sys.argv[1]
 
 try:
     with open(filename, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+        lines = f.read().split('\n')
+    if lines[-1] == '':
+        lines.pop()  # text ends with a newline (or is empty)
 
+    # Pad every line and write the whole file in one go
     with open(filename, "w", encoding="utf-8") as f:
-        for line in lines:
-            f.write(line.rstrip('\n').ljust(160) + '\n')
+        f.write(''.join([line.ljust(160) + '\n' for line in lines]))
 
     print(f"Lines in '{filename}' have been right-padded to 160 characters.")
 except Exception as e:
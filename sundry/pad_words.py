@@ -2,14 +2,15 @@ import re
 import sys
 import os
 
+# This pattern matches only target words, not surrounding punctuation or spaces
+WORD_PATTERN = re.compile(r"\b[a-z',]+\b\s*")
+
 def pad_all_words(text, pad_width=12):
     def pad_match(match):
         word = match.group(0).strip()          # remove any accidental spaces
         return word.ljust(pad_width)           # pad the cleaned word
 
-    # This pattern matches only target words, not surrounding punctuation or spaces
-    pattern = r"\b[a-z',]+\b\s*"
-    return re.sub(pattern, pad_match, text)
+    return WORD_PATTERN.sub(pad_match, text)
 
 def main():
     if len(sys.argv) != 2:
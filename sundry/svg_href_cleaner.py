@@ -14,6 +14,11 @@ import sys
 from xml.etree import ElementTree as ET
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # =============================================================================
 # XML NAMESPACE CONFIGURATION
 # =============================================================================
@@ -22,19 +27,19 @@ from pathlib import Path
 SVG_NAMESPACE = "http://www.w3.org/2000/svg"
 XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
 
+# Prefix of the LilyPond point-and-click hrefs in the SVG
+TEXTEDIT_PREFIX = "textedit:///work/"
+
 # Register namespaces to ensure clean output without ns0: prefixes
 ET.register_namespace("", SVG_NAMESPACE)      # SVG as default namespace
 ET.register_namespace("xlink", XLINK_NAMESPACE)  # XLink for href attributes
 
-# Namespace map for XPath queries
-NAMESPACE_MAP = {
-    "svg": SVG_NAMESPACE, 
-    "xlink": XLINK_NAMESPACE
-}
-
 def load_json_notes(json_file):
-    """Load and parse the JSON notes file."""
+    """Load and parse the JSON notes file (orjson when available)."""
     try:
+        if orjson is not None:
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError
+            return orjson.loads(Path(json_file).read_bytes())
         with open(json_file, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
@@ -46,19 +51,19 @@ def load_json_notes(json_file):
 
 
 def extract_valid_hrefs(notes_data):
-    """Extract all valid href references from the JSON notes data."""
+    """Extract all valid href references from the JSON notes data (without the SVG textedit prefix)."""
     valid_hrefs = set()
     
     for note in notes_data:
         if isinstance(note, dict) and 'hrefs' in note:
             hrefs = note['hrefs']
             if isinstance(hrefs, list):
-                for href in hrefs:
-                    # Convert JSON href format to SVG textedit format
-                    # "_1/m001_008.ly:31:4:5" becomes "textedit:///work/_1/m001_008.ly:31:4:5"
-                    valid_hrefs.add(f"textedit:///work/{href}")
+                # Stored without the SVG textedit prefix: the SVG side strips it instead
+                # "textedit:///work/_1/m001_008.ly:31:4:5" is checked as "_1/m001_008.ly:31:4:5"
+                # str() as the prefixed f-string did, so non-string hrefs still compare as text
+                valid_hrefs.update(map(str, hrefs))
     
-    return valid_hrefs
+    return frozenset(valid_hrefs)
 
 
 def clean_svg_hrefs(svg_file, valid_hrefs):
@@ -68,44 +73,40 @@ def clean_svg_hrefs(svg_file, valid_hrefs):
         tree = ET.parse(svg_file)
         root = tree.getroot()
         
-        # Find all elements with href attributes
-        # Note: SVG href attributes might be in different namespaces
-        href_attrs = ['{http://www.w3.org/1999/xlink}href', 'href']
-        
-        elements_with_href = []
-        for href_attr in href_attrs:
-            elements_with_href.extend(root.findall(f".//*[@{href_attr}]", NAMESPACE_MAP))
-        
-        # Also search without namespace prefix in case it's not declared
-        for elem in root.iter():
-            for attr_name in elem.attrib:
-                if attr_name.endswith('href') and elem not in elements_with_href:
-                    elements_with_href.append(elem)
-        
-        print(f"Found {len(elements_with_href)} elements with href attributes")
-        
+        # Visit every element once: an href attribute may be xlink:href, a plain
+        # href, or any attribute ending in href (namespace not declared)
+        href_element_count = 0
         removed_count = 0
         kept_count = 0
+        is_valid_href = valid_hrefs.__contains__
         
-        # Check each element and remove unused hrefs
-        for element in elements_with_href:
+        for element in root.iter():
             href_value = None
             href_attr_name = None
+            has_href = False
             
             # Find the href attribute (could be in different namespaces)
             for attr_name, attr_value in element.attrib.items():
-                if attr_name.endswith('href') and attr_value.startswith('textedit:///work/'):
-                    href_value = attr_value
-                    href_attr_name = attr_name
-                    break
+                if attr_name.endswith('href'):
+                    has_href = True
+                    if attr_value.startswith(TEXTEDIT_PREFIX):
+                        href_value = attr_value
+                        href_attr_name = attr_name
+                        break
+            
+            if not has_href:
+                continue
+            href_element_count += 1
             
+            # Remove the href if it is unused
             if href_value and href_attr_name:
-                if href_value in valid_hrefs:
+                if is_valid_href(href_value[len(TEXTEDIT_PREFIX):]):
                     kept_count += 1
                 else:
                     del element.attrib[href_attr_name]
                     removed_count += 1
         
+        print(f"Found {href_element_count} elements with href attributes")
         print(f"Removed {removed_count} unused href attributes")
         print(f"Kept {kept_count} valid href attributes")
         
@@ -31,7 +31,13 @@ Process:
 """
 
 from xml.etree import ElementTree as ET
+from xml.parsers import expat
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from fnmatch import fnmatch
 from pathlib import Path
+import io
+import os
 import re
 import sys
 
@@ -43,9 +49,22 @@ import sys
 # Matches: translate(x, y) or translate(x,y) formats with integer/decimal numbers
 TRANSLATE_PATTERN = re.compile(r"translate\(([-\d.]+),\s*([-\d.]+)\)")
 
+# Pieces of the root element's start tag in raw SVG bytes, matched from the
+# byte offset the XML parser reports for it (attribute values may contain '>')
+START_TAG_NAME_PATTERN = re.compile(rb"<[^\s/>]+")
+ATTRIBUTE_PATTERN = re.compile(rb"""(\s+)([^\s=/>]+)(\s*=\s*)(["'])(.*?)\4""", re.DOTALL)
+START_TAG_END_PATTERN = re.compile(rb"\s*/?>")
+
+# Standard SVG and XLink namespaces used in LilyPond-generated files
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
+
+# Fully-qualified tag of SVG group elements, as ElementTree reports it
+SVG_GROUP_TAG = f"{{{SVG_NAMESPACE}}}g"
+
 # Register SVG namespaces for clean output without ns0: prefixes
-ET.register_namespace("", "http://www.w3.org/2000/svg")
-ET.register_namespace("xlink", "http://www.w3.org/1999/xlink")
+ET.register_namespace("", SVG_NAMESPACE)
+ET.register_namespace("xlink", XLINK_NAMESPACE)
 
 # Musical layout margins (in SVG coordinate units)
 VERTICAL_MARGIN = 5.0      # Space above/below staff systems
@@ -55,7 +74,135 @@ HORIZONTAL_MARGIN = 0.0    # Space left/right of notation (can be increased if n
 # VIEWBOX CALCULATION ENGINE
 # =============================================================================
 
-def tighten_viewbox(input_svg_path, output_svg_path):
+class _RootElementFound(Exception):
+    """Raised by the expat handler to stop parsing at the root start tag."""
+
+def find_root_start_tag(svg_bytes):
+    """
+    Locate the root element's start tag in raw SVG bytes.
+    
+    The offset comes from the XML parser itself, so comments, processing
+    instructions or a DOCTYPE before the root can never be mistaken for it.
+    
+    Args:
+        svg_bytes (bytes): Original SVG file contents
+        
+    Returns:
+        int: Byte offset of the '<' opening the root element, or None if the
+        document has no well-formed root start tag
+    """
+    
+    parser = expat.ParserCreate()
+    
+    def record_root_offset(name, attributes):
+        raise _RootElementFound(parser.CurrentByteIndex)
+    
+    parser.StartElementHandler = record_root_offset
+    try:
+        parser.Parse(svg_bytes, True)
+    except _RootElementFound as found:
+        return found.args[0]
+    except expat.ExpatError:
+        pass
+    return None
+
+def replace_root_viewbox(svg_bytes, viewbox):
+    """
+    Rewrite (or add) the viewBox attribute of the root element in raw SVG bytes.
+    
+    Args:
+        svg_bytes (bytes): Original SVG file contents
+        viewbox (str): New viewBox value
+        
+    Returns:
+        bytes: SVG contents with the new viewBox, or None if the root start tag
+        could not be located
+    """
+    
+    tag_start = find_root_start_tag(svg_bytes)
+    if tag_start is None:
+        return None
+    
+    tag_name = START_TAG_NAME_PATTERN.match(svg_bytes, tag_start)
+    if tag_name is None:
+        return None
+    
+    # Walk the attributes one by one so quoted values are skipped as a whole
+    encoded_viewbox = viewbox.encode("utf-8")
+    position = tag_name.end()
+    while True:
+        attribute = ATTRIBUTE_PATTERN.match(svg_bytes, position)
+        if attribute is None:
+            break
+        if attribute.group(2) == b"viewBox":
+            return svg_bytes[:attribute.start(5)] + encoded_viewbox + svg_bytes[attribute.end(5):]
+        position = attribute.end()
+    
+    if START_TAG_END_PATTERN.match(svg_bytes, position) is None:
+        return None
+    
+    # No viewBox yet: add it after the last attribute (before '>' or '/>')
+    return svg_bytes[:position] + b' viewBox="' + encoded_viewbox + b'"' + svg_bytes[position:]
+
+def scan_group_positions(input_path):
+    """
+    Stream an SVG once, collecting the root viewBox and all group translations.
+    
+    Args:
+        input_path (Path or file): SVG file to scan, or a binary file object
+        
+    Returns:
+        tuple: (current_viewbox, x_positions, y_positions, total_groups_scanned),
+        where current_viewbox is "not set" if the root element has no viewBox
+        
+    Raises:
+        ET.ParseError: If the SVG is not well-formed
+        FileNotFoundError: If the SVG file does not exist
+    """
+    
+    # Coordinates of all positioned elements, reduced by the caller
+    x_positions = []
+    y_positions = []
+    total_groups_scanned = 0
+    current_viewbox = "not set"
+    
+    # Stream the SVG instead of building the full DOM: each <g> is scanned as
+    # its start tag arrives and finished top-level subtrees are dropped
+    svg_root = None
+    depth = 0
+    for event, element in ET.iterparse(input_path, events=("start", "end")):
+        if event == "end":
+            depth -= 1
+            if depth == 1:
+                svg_root.clear()
+            continue
+        
+        depth += 1
+        if svg_root is None:
+            svg_root = element
+            current_viewbox = svg_root.get("viewBox", current_viewbox)
+            continue
+        
+        # Scan all group elements for position information
+        # LilyPond places musical elements in <g> tags with translate transforms
+        if element.tag != SVG_GROUP_TAG:
+            continue
+        total_groups_scanned += 1
+        
+        # Extract transform attribute (contains positioning data)
+        transform_attribute = element.get("transform")
+        
+        if transform_attribute:
+            # Parse translate(x, y) coordinates using regex
+            coordinate_match = TRANSLATE_PATTERN.search(transform_attribute)
+            
+            if coordinate_match:
+                x_positions.append(float(coordinate_match.group(1)))
+                y_positions.append(float(coordinate_match.group(2)))
+    
+    return current_viewbox, x_positions, y_positions, total_groups_scanned
+
+def tighten_viewbox(input_svg_path, output_svg_path, verbose=True):
     """
     Calculate optimal viewBox dimensions based on actual musical content boundaries.
     
@@ -66,14 +213,16 @@ def tighten_viewbox(input_svg_path, output_svg_path):
     Args:
         input_svg_path (str): Path to input SVG file with oversized viewBox
         output_svg_path (str): Path for output SVG with optimized viewBox
+        verbose (bool): Print the step-by-step report; when False, print only
+            a one-line summary (or error) for the file
         
     Process Details:
-    1. Load and parse the SVG file structure
+    1. Stream-parse the SVG file structure (no full DOM is kept)
     2. Scan all <g> elements for transform="translate(x,y)" attributes
     3. Build coordinate dataset from all positioned elements
     4. Calculate bounding box encompassing all content
     5. Add musical margins for comfortable reading
-    6. Update root SVG element's viewBox attribute
+    6. Update root SVG element's viewBox attribute in the original bytes
     7. Save optimized SVG with new dimensions
     
     Coordinate System:
@@ -86,73 +235,59 @@ def tighten_viewbox(input_svg_path, output_svg_path):
     input_path = Path(input_svg_path)
     output_path = Path(output_svg_path)
     
-    print(f"🎼 Optimizing viewBox: {input_path.name}")
-    
-    # =================================================================
-    # SVG LOADING AND PARSING
-    # =================================================================
-    
-    try:
-        print("   📖 Loading SVG structure...")
-        svg_tree = ET.parse(input_path)
-        svg_root = svg_tree.getroot()
-        
-    except ET.ParseError as parse_error:
-        print(f"   ❌ SVG parsing failed: {parse_error}")
-        return
-    except FileNotFoundError:
-        print(f"   ❌ Input file not found: {input_path}")
-        return
+    if verbose:
+        print(f"🎼 Optimizing viewBox: {input_path.name}")
     
     # =================================================================
-    # COORDINATE EXTRACTION FROM POSITIONED ELEMENTS
+    # SVG STREAMING AND COORDINATE EXTRACTION
     # =================================================================
     
-    print("   🔍 Analyzing element positions...")
-    
     # Initialize boundary tracking variables
     min_x_coord = float("inf")    # Leftmost content position
     min_y_coord = float("inf")    # Topmost content position  
     max_x_coord = float("-inf")   # Rightmost content position
     max_y_coord = float("-inf")   # Bottommost content position
     
-    positioned_elements_count = 0
-    total_groups_scanned = 0
-    
-    # Scan all group elements for position information
-    # LilyPond places musical elements in <g> tags with translate transforms
-    for group_element in svg_root.findall(".//{http://www.w3.org/2000/svg}g"):
-        total_groups_scanned += 1
+    try:
+        if verbose:
+            print("   📖 Loading SVG structure...")
+            print("   🔍 Analyzing element positions...")
         
-        # Extract transform attribute (contains positioning data)
-        transform_attribute = group_element.get("transform")
+        # Read the file once: the same bytes are scanned and then patched for output
+        svg_bytes = input_path.read_bytes()
+        _, x_positions, y_positions, total_groups_scanned = scan_group_positions(io.BytesIO(svg_bytes))
         
-        if transform_attribute:
-            # Parse translate(x, y) coordinates using regex
-            coordinate_match = TRANSLATE_PATTERN.search(transform_attribute)
-            
-            if coordinate_match:
-                x_position = float(coordinate_match.group(1))
-                y_position = float(coordinate_match.group(2))
-                
-                # Update bounding box coordinates
-                min_x_coord = min(min_x_coord, x_position)
-                min_y_coord = min(min_y_coord, y_position)
-                max_x_coord = max(max_x_coord, x_position)
-                max_y_coord = max(max_y_coord, y_position)
-                
-                positioned_elements_count += 1
-    
-    print(f"   📊 Coordinate analysis:")
-    print(f"      Groups scanned: {total_groups_scanned}")
-    print(f"      Positioned elements found: {positioned_elements_count}")
+    except ET.ParseError as parse_error:
+        if verbose:
+            print(f"   ❌ SVG parsing failed: {parse_error}")
+        else:
+            print(f"❌ {input_path.name}: SVG parsing failed: {parse_error}")
+        return
+    except FileNotFoundError:
+        if verbose:
+            print(f"   ❌ Input file not found: {input_path}")
+        else:
+            print(f"❌ Input file not found: {input_path}")
+        return
+    
+    # Update bounding box coordinates
+    positioned_elements_count = len(x_positions)
+    if positioned_elements_count > 0:
+        min_x_coord, max_x_coord = min(x_positions), max(x_positions)
+        min_y_coord, max_y_coord = min(y_positions), max(y_positions)
+    
+    if verbose:
+        print(f"   📊 Coordinate analysis:")
+        print(f"      Groups scanned: {total_groups_scanned}")
+        print(f"      Positioned elements found: {positioned_elements_count}")
     
     # =================================================================
     # VIEWBOX CALCULATION AND APPLICATION
     # =================================================================
     
     if min_x_coord < float("inf") and min_y_coord < float("inf"):
-        print("   📐 Calculating optimal viewBox dimensions...")
+        if verbose:
+            print("   📐 Calculating optimal viewBox dimensions...")
         
         # Apply margins for comfortable musical reading
         adjusted_min_x = min_x_coord - HORIZONTAL_MARGIN
@@ -165,50 +300,70 @@ def tighten_viewbox(input_svg_path, output_svg_path):
         # Format viewBox string: "min_x min_y width height"
         optimized_viewbox = f"{adjusted_min_x:.4f} {adjusted_min_y:.4f} {content_width:.4f} {content_height:.4f}"
         
-        # Apply new viewBox to root SVG element
-        svg_root.set("viewBox", optimized_viewbox)
-        
         result_message = f"[ Updated viewBox: {optimized_viewbox} ]"
         
         # Report optimization statistics
-        print(f"   🎯 ViewBox optimization:")
-        print(f"      Content bounds: X({min_x_coord:.1f} to {max_x_coord:.1f}), Y({min_y_coord:.1f} to {max_y_coord:.1f})")
-        print(f"      Final dimensions: {content_width:.1f} × {content_height:.1f}")
-        print(f"      Margins applied: H={HORIZONTAL_MARGIN}, V={VERTICAL_MARGIN}")
+        if verbose:
+            print(f"   🎯 ViewBox optimization:")
+            print(f"      Content bounds: X({min_x_coord:.1f} to {max_x_coord:.1f}), Y({min_y_coord:.1f} to {max_y_coord:.1f})")
+            print(f"      Final dimensions: {content_width:.1f} × {content_height:.1f}")
+            print(f"      Margins applied: H={HORIZONTAL_MARGIN}, V={VERTICAL_MARGIN}")
         
     else:
         # No positioned elements found - likely an issue with the SVG structure
+        optimized_viewbox = None
         result_message = "[ ⚠️ Warning: No positioned elements found - viewBox unchanged ]"
-        print("   ⚠️  No valid transform=translate(x, y) coordinates found")
-        print("      This may indicate:")
-        print("      • SVG uses different positioning method")
-        print("      • File structure differs from expected LilyPond format")
-        print("      • All content is positioned at origin")
+        if verbose:
+            print("   ⚠️  No valid transform=translate(x, y) coordinates found")
+            print("      This may indicate:")
+            print("      • SVG uses different positioning method")
+            print("      • File structure differs from expected LilyPond format")
+            print("      • All content is positioned at origin")
 
     # =================================================================
     # OPTIMIZED SVG OUTPUT
     # =================================================================
     
-    print(f"   💾 Writing optimized SVG...")
+    if verbose:
+        print(f"   💾 Writing optimized SVG...")
     
     try:
-        # Write SVG with proper XML declaration and UTF-8 encoding
-        svg_tree.write(output_path, encoding="utf-8", xml_declaration=True)
+        # Copy the original bytes, only rewriting the root viewBox attribute,
+        # instead of re-serializing the whole document
+        if optimized_viewbox is not None:
+            patched_bytes = replace_root_viewbox(svg_bytes, optimized_viewbox)
+        else:
+            patched_bytes = svg_bytes
+        
+        if patched_bytes is not None:
+            output_path.write_bytes(patched_bytes)
+        else:
+            # Root start tag not located in the bytes: set the viewBox on the parsed tree
+            # and write SVG with proper XML declaration and UTF-8 encoding
+            svg_tree = ET.parse(io.BytesIO(svg_bytes))
+            svg_tree.getroot().set("viewBox", optimized_viewbox)
+            svg_tree.write(output_path, encoding="utf-8", xml_declaration=True)
         
         # File size comparison for optimization validation
-        original_size = input_path.stat().st_size
+        original_size = len(svg_bytes)
         optimized_size = output_path.stat().st_size
         
-        print(f"✅ ViewBox optimization complete: {output_path}")
-        print(f"   📊 {result_message}")
-        print(f"   📏 File size: {original_size:,} → {optimized_size:,} bytes")
-        
-        # Note about further optimizations
-        if positioned_elements_count > 0:
-            print(f"   🎵 SVG now optimally sized for musical content")
+        if verbose:
+            print(f"✅ ViewBox optimization complete: {output_path}")
+            print(f"   📊 {result_message}")
+            print(f"   📏 File size: {original_size:,} → {optimized_size:,} bytes")
+            
+            # Note about further optimizations
+            if positioned_elements_count > 0:
+                print(f"   🎵 SVG now optimally sized for musical content")
+        else:
+            print(f"✅ {input_path.name} → {output_path.name} {result_message}")
         
     except Exception as write_error:
-        print(f"   ❌ Failed to write optimized file: {write_error}")
+        if verbose:
+            print(f"   ❌ Failed to write optimized file: {write_error}")
+        else:
+            print(f"❌ {input_path.name}: Failed to write optimized file: {write_error}")
 
 # =============================================================================
 # VIEWBOX ANALYSIS UTILITIES
@@ -226,30 +381,13 @@ def analyze_current_viewbox(svg_path):
     """
     
     try:
-        tree = ET.parse(svg_path)
-        root = tree.getroot()
-        
-        # Get current viewBox
-        current_viewbox = root.get("viewBox", "not set")
-        
-        # Analyze content bounds
-        min_x, min_y = float("inf"), float("inf")
-        max_x, max_y = float("-inf"), float("-inf")
-        element_count = 0
-        
-        for group in root.findall(".//{http://www.w3.org/2000/svg}g"):
-            transform = group.get("transform")
-            if transform:
-                match = TRANSLATE_PATTERN.search(transform)
-                if match:
-                    x, y = float(match.group(1)), float(match.group(2))
-                    min_x, min_y = min(min_x, x), min(min_y, y)
-                    max_x, max_y = max(max_x, x), max(max_y, y)
-                    element_count += 1
+        # Same streaming scan as tighten_viewbox, without writing anything
+        current_viewbox, xs, ys, _ = scan_group_positions(svg_path)
+        element_count = len(xs)
         
         return {
             'current_viewbox': current_viewbox,
-            'content_bounds': (min_x, min_y, max_x, max_y) if element_count > 0 else None,
+            'content_bounds': (min(xs), min(ys), max(xs), max(ys)) if element_count > 0 else None,
             'positioned_elements': element_count,
             'file_size': Path(svg_path).stat().st_size
         }
@@ -261,10 +399,52 @@ def analyze_current_viewbox(svg_path):
 # BATCH PROCESSING INTERFACE
 # =============================================================================
 
+def _tighten_viewbox_captured(input_svg_path, output_svg_path):
+    """
+    Run tighten_viewbox in a worker process, capturing its progress output.
+    
+    Args:
+        input_svg_path (str): Path to input SVG file
+        output_svg_path (str): Path for output SVG file
+        
+    Returns:
+        str: Everything tighten_viewbox printed, for the parent process to show
+    """
+    
+    with redirect_stdout(io.StringIO()) as captured_output:
+        tighten_viewbox(input_svg_path, output_svg_path, verbose=False)
+    return captured_output.getvalue()
+
+def list_matching_files(directory, name_pattern):
+    """
+    List the files in a directory whose names match a glob-style pattern.
+    
+    A single os.scandir pass reuses the directory entries' cached file types
+    instead of building and stat-ing a Path for every entry.
+    
+    Args:
+        directory (Path): Directory to search (not recursive)
+        name_pattern (str): fnmatch-style pattern for the file names
+        
+    Returns:
+        list: Paths of the matching files, empty if the directory does not exist
+    """
+    
+    try:
+        with os.scandir(directory) as entries:
+            return [Path(entry.path) for entry in entries
+                    if fnmatch(entry.name, name_pattern) and entry.is_file()]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
 def process_multiple_files(file_patterns):
     """
     Process multiple SVG files with viewBox optimization.
     
+    Files are independent of each other, so batches of more than one file are
+    optimized in parallel worker processes; their output is shown in input order.
+    Each file reports a one-line summary instead of the full step-by-step log.
+    
     Args:
         file_patterns (list): List of file paths or glob patterns
         
@@ -275,6 +455,8 @@ def process_multiple_files(file_patterns):
     processed = []
     failed = []
     
+    # Collect all (input, output) pairs before processing any of them
+    file_pairs = []
     for pattern in file_patterns:
         pattern_path = Path(pattern)
         
@@ -282,18 +464,36 @@ def process_multiple_files(file_patterns):
         if pattern_path.is_file():
             files = [pattern_path]
         else:
-            files = list(pattern_path.parent.glob(pattern_path.name))
+            files = list_matching_files(pattern_path.parent, pattern_path.name)
         
         for input_file in files:
             if input_file.suffix.lower() == '.svg':
                 output_file = input_file.parent / f"{input_file.stem}_bounded.svg"
-                
+                file_pairs.append((input_file, output_file))
+    
+    if len(file_pairs) > 1:
+        max_workers = min(os.cpu_count() or 1, len(file_pairs))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_tighten_viewbox_captured, str(input_file), str(output_file))
+                for input_file, output_file in file_pairs
+            ]
+            
+            for (input_file, output_file), future in zip(file_pairs, futures):
                 try:
-                    tighten_viewbox(str(input_file), str(output_file))
+                    sys.stdout.write(future.result())
                     processed.append((input_file, output_file))
                 except Exception as process_error:
                     print(f"❌ Failed to process {input_file}: {process_error}")
                     failed.append(input_file)
+    else:
+        for input_file, output_file in file_pairs:
+            try:
+                tighten_viewbox(str(input_file), str(output_file), verbose=False)
+                processed.append((input_file, output_file))
+            except Exception as process_error:
+                print(f"❌ Failed to process {input_file}: {process_error}")
+                failed.append(input_file)
     
     return {
         'processed': processed,